@@ -30,9 +30,22 @@ HISTORIES_JSON = os.path.join(BASE_DIR, "data", "histories.json")
 
 # 流水线状态文件（断点续传）
 PIPELINE_STATE_FILE = os.path.join(BASE_DIR, "data", "pipeline_state.json")
+# 状态的追加日志——阶段完成时 O(1) 追加一行，加载时在快照上重放
+PIPELINE_STATE_LOG = os.path.join(BASE_DIR, "data", "pipeline_state.log")
 
-# URL 映射文件
+# URL 映射文件（SQLite 为权威存储，JSON 为面向下游的导出）
 URL_MAPPING_FILE = os.path.join(RAW_HTML_DIR, "url_mapping.json")
+URL_MAPPING_DB = os.path.join(RAW_HTML_DIR, "url_mapping.sqlite")
+
+# 已见 URL 数据库（跨运行去重，避免重复搜索/下载）
+SEEN_URLS_DB = os.path.join(BASE_DIR, "data", "seen_urls.sqlite")
+
+# LLM 调用磁盘缓存目录（内容寻址，重跑流水线时零成本命中）
+LLM_CACHE_DIR = os.path.join(BASE_DIR, "data", "cache", "llm")
+
+# 改写调用的语义相似缓存（句向量余弦命中即复用，见 semantic_cache.py）
+SEMANTIC_CACHE_DIR = os.path.join(BASE_DIR, "data", "cache", "semantic")
+SEMANTIC_CACHE_THRESHOLD = 0.95
 
 # ======================= 网页分类域 ========================
 
@@ -170,13 +183,41 @@ SEARCH_INTERVAL = 3
 DOWNLOAD_TIMEOUT = 90
 MAX_RETRIES = 2
 REQUEST_DELAY = 1
-CONCURRENT_DOWNLOADS = 5      # 同时下载的最大线程数
+PER_HOST_DELAY = 1.0          # 同一主机两次请求的最小间隔（秒），不同主机互不等待
+CONCURRENT_DOWNLOADS = 20     # 同时下载的最大并发数（aiohttp 协程 / 回退线程）
+
+
+# ======================= 渲染输出 ==========================
+
+# 使用 cv2 (libpng 直写) 编码截图 PNG；False 或 cv2 缺失时走 PIL。
+# 大截图上 cv2 编码约快 2–3×，但多一个重依赖，默认关闭。
+USE_CV2_PNG_ENCODER = False
+
+# 截图尺寸修正需要真正缩放时使用 LANCZOS（慢，高质量）；
+# 默认 BILINEAR——本管线里质量差异可忽略，速度约快 3–6×
+HIGH_QUALITY_RESIZE = False
 
 
 # ======================= single-file-cli 检测 ==============
 
+# 检测结果缓存文件 — config 会被 worker 子进程反复 import，
+# 命中缓存即可跳过每次 import 的多次 PATH 扫描
+_SINGLE_FILE_BIN_CACHE = os.path.join(
+    os.path.expanduser("~"), ".cache", "webinject", "single_file_bin"
+)
+
+
 def _detect_single_file_bin() -> str:
-    """自动检测 single-file-cli 可执行文件路径。"""
+    """自动检测 single-file-cli 可执行文件路径（结果缓存到磁盘）。"""
+    # 优先读缓存，并校验路径仍然有效
+    try:
+        with open(_SINGLE_FILE_BIN_CACHE, "r", encoding="utf-8") as f:
+            cached = f.read().strip()
+        if cached and (os.path.isfile(cached) or shutil.which(cached)):
+            return cached
+    except OSError:
+        pass
+
     if platform.system() == "Windows":
         candidates = ["single-file.cmd", "single-file.exe", "single-file"]
     else:
@@ -185,6 +226,7 @@ def _detect_single_file_bin() -> str:
     for name in candidates:
         found = shutil.which(name)
         if found:
+            _cache_single_file_bin(found)
             return found
 
     env_dir = os.path.dirname(sys.executable)
@@ -197,9 +239,21 @@ def _detect_single_file_bin() -> str:
         for name in candidates:
             candidate_path = os.path.join(search_dir, name)
             if os.path.isfile(candidate_path):
+                _cache_single_file_bin(candidate_path)
                 return candidate_path
 
+    # 未找到——不缓存兜底猜测，下次 import 仍重新探测
     return "single-file.cmd" if platform.system() == "Windows" else "single-file"
 
 
+def _cache_single_file_bin(path: str):
+    """将探测结果写入缓存文件（失败时静默忽略）。"""
+    try:
+        os.makedirs(os.path.dirname(_SINGLE_FILE_BIN_CACHE), exist_ok=True)
+        with open(_SINGLE_FILE_BIN_CACHE, "w", encoding="utf-8") as f:
+            f.write(path)
+    except OSError:
+        pass
+
+
 SINGLE_FILE_BIN = _detect_single_file_bin()
@@ -10,21 +10,54 @@
 #   4. 支持断点续传（已下载的文件自动跳过）
 # ============================================================
 
+from __future__ import annotations
+
+import asyncio
 import json
 import os
 import re
 import shutil
 import signal
+import sqlite3
 import subprocess
 import sys
 import time
 import platform as _platform_mod
 from typing import Optional
-from urllib.parse import parse_qs, unquote, urlparse
+from urllib.parse import unquote, urlparse
 
 import requests
 from bs4 import BeautifulSoup
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None  # aiohttp 未安装时回退到 single-file-cli 下载
+
+try:
+    import aiofiles
+except ImportError:
+    aiofiles = None  # aiofiles 未安装时退化为同步分块写入
+
+try:
+    # 进程内 headless 浏览器池：JS 渲染页面不再为每个 URL
+    # 启动一个 single-file-cli Node 子进程
+    from playwright.async_api import async_playwright
+except ImportError:
+    async_playwright = None
+
+try:
+    # C 实现的 HTML 解析器，比纯 Python 的 html.parser 快一个数量级
+    from selectolax.parser import HTMLParser as _SelectolaxParser
+except ImportError:
+    _SelectolaxParser = None  # 未安装时回退 BeautifulSoup
+
+try:
+    # Rust 实现的 JSON 序列化（排序 + 缩进比标准库快 5-10 倍）
+    import orjson
+except ImportError:
+    orjson = None  # 未安装时回退标准库 json
+
 import config
 
 # 平台检测
@@ -178,6 +211,9 @@ def _wait_for_captcha(driver, check_fn, timeout: Optional[int] = None) -> bool:
         True = 用户已完成验证或无需验证
         False = 超时
     """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
+
     if timeout is None:
         timeout = config.CAPTCHA_WAIT_TIMEOUT
 
@@ -190,31 +226,65 @@ def _wait_for_captcha(driver, check_fn, timeout: Optional[int] = None) -> bool:
     print(f"    等待超时: {timeout} 秒")
     print("=" * 60)
 
-    start = time.time()
-    while check_fn(driver):
-        elapsed = time.time() - start
-        if elapsed > timeout:
-            print(f"[Search] 人机验证等待超时 ({timeout}s)!")
-            return False
-        remaining = int(timeout - elapsed)
-        print(f"\r[Search] 等待验证完成... 剩余 {remaining}s  ", end="", flush=True)
-        time.sleep(2)
+    # WebDriverWait 内部以 poll_frequency 轮询轻量探针，
+    # 比手写 sleep 循环响应更快、开销更低
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=1.0).until(
+            lambda d: not check_fn(d)
+        )
+    except TimeoutException:
+        print(f"[Search] 人机验证等待超时 ({timeout}s)!")
+        return False
 
-    print(f"\n[Search] 验证已通过! 继续搜索...")
+    print(f"[Search] 验证已通过! 继续搜索...")
     return True
 
 
 # ============================================================
 # Google 搜索（Selenium 可见浏览器）
 # ============================================================
+
+# 结果过滤黑名单 / 人机验证特征 — 模块加载时编译一次，
+# 避免在逐链接循环和 2 秒轮询里重复做 Python 级子串扫描
+_GOOGLE_BLOCK_RE = re.compile(
+    r"google\.com|google\.co|googleapis\.com|gstatic\.com|youtube\.com|webcache\."
+)
+_BING_BLOCK_RE = re.compile(r"bing\.com|microsoft\.com|msn\.com|live\.com")
+
+_GOOGLE_CAPTCHA_URL_RE = re.compile(r"sorry/index|/recaptcha/")
+_GOOGLE_CAPTCHA_PAGE_RE = re.compile(r"unusual traffic|我们的系统检测到")
+_BING_CAPTCHA_URL_RE = re.compile(r"captcha|/challenge/")
+_BING_CAPTCHA_PAGE_RE = re.compile(r"人机验证|verify you are human")
+
+
+# 轻量 DOM 探针：只传回标题和一个选择器命中标记，
+# 避免每次轮询都把整个 page_source（数百 KB）拉过 WebDriver 连接
+_CAPTCHA_PROBE_JS = (
+    "return (document.querySelector("
+    "'#captcha-form, #recaptcha, .g-recaptcha, iframe[src*=\"captcha\"]'"
+    ") ? 'CAPTCHA' : '') + ' ' + document.title"
+)
+
+
+def _captcha_probe(driver) -> str:
+    """返回小写的轻量探针结果（选择器标记 + 页面标题）。"""
+    return str(driver.execute_script(_CAPTCHA_PROBE_JS) or "").lower()
+
+
 def _is_google_captcha(driver) -> bool:
     """检测是否在 Google 人机验证页面。"""
     try:
         url = driver.current_url.lower()
-        page = driver.page_source.lower()
-        if "sorry/index" in url or "/recaptcha/" in url:
+        if _GOOGLE_CAPTCHA_URL_RE.search(url):
             return True
-        if "unusual traffic" in page or "我们的系统检测到" in page:
+
+        # 先用轻量探针，命中可疑特征时才做完整 page_source 检查
+        probe = _captcha_probe(driver)
+        if "captcha" not in probe and "unusual traffic" not in probe:
+            return False
+
+        page = driver.page_source.lower()
+        if _GOOGLE_CAPTCHA_PAGE_RE.search(page):
             return True
         if "recaptcha" in page and "search" not in url:
             return True
@@ -232,6 +302,7 @@ def _google_search(query: str, num_results: int = 10) -> list:
 
     driver = _get_search_driver()
     urls: list[str] = []
+    seen: set[str] = set()
 
     try:
         from urllib.parse import quote as url_quote
@@ -260,15 +331,13 @@ def _google_search(query: str, num_results: int = 10) -> list:
                     continue
                 parsed = urlparse(href)
                 # 排除 Google 自身的链接
-                if any(d in parsed.netloc for d in [
-                    "google.com", "google.co", "googleapis.com",
-                    "gstatic.com", "youtube.com", "webcache.",
-                ]):
+                if _GOOGLE_BLOCK_RE.search(parsed.netloc):
                     continue
                 # 排除 Google 翻译/缓存
                 if "/translate?" in href or "webcache.googleusercontent" in href:
                     continue
-                if href not in urls:
+                if href not in seen:
+                    seen.add(href)
                     urls.append(href)
                 if len(urls) >= num_results:
                     break
@@ -288,10 +357,16 @@ def _is_bing_captcha(driver) -> bool:
     """检测是否在 Bing 人机验证页面。"""
     try:
         url = driver.current_url.lower()
-        page = driver.page_source.lower()
-        if "captcha" in url or "/challenge/" in url:
+        if _BING_CAPTCHA_URL_RE.search(url):
             return True
-        if "人机验证" in page or "verify you are human" in page:
+
+        # 先用轻量探针，命中可疑特征时才做完整 page_source 检查
+        probe = _captcha_probe(driver)
+        if "captcha" not in probe and "verify" not in probe and "blocked" not in probe:
+            return False
+
+        page = driver.page_source.lower()
+        if _BING_CAPTCHA_PAGE_RE.search(page):
             return True
         if "blocked" in page and "bing.com" in url:
             return True
@@ -308,6 +383,7 @@ def _bing_search(query: str, num_results: int = 10) -> list:
 
     driver = _get_search_driver()
     urls: list[str] = []
+    seen: set[str] = set()
 
     try:
         from urllib.parse import quote as url_quote
@@ -335,11 +411,10 @@ def _bing_search(query: str, num_results: int = 10) -> list:
                 if not href.startswith("http"):
                     continue
                 parsed = urlparse(href)
-                if any(d in parsed.netloc for d in [
-                    "bing.com", "microsoft.com", "msn.com", "live.com",
-                ]):
+                if _BING_BLOCK_RE.search(parsed.netloc):
                     continue
-                if href not in urls:
+                if href not in seen:
+                    seen.add(href)
                     urls.append(href)
                 if len(urls) >= num_results:
                     break
@@ -355,22 +430,79 @@ def _bing_search(query: str, num_results: int = 10) -> list:
 # ============================================================
 # DuckDuckGo 搜索（requests，无需浏览器）
 # ============================================================
-def _duckduckgo_search(query: str, num_results: int = 10) -> list:
-    """通过 DuckDuckGo HTML 版搜索获取 URL（国内可直接访问）。"""
+
+def _extract_ddg_links(html: str) -> list:
+    """从 DDG HTML 结果页中提取所有 a.result__a 的 href。"""
+    if _SelectolaxParser is not None:
+        tree = _SelectolaxParser(html)
+        return [node.attributes.get("href") or "" for node in tree.css("a.result__a")]
+
+    soup = BeautifulSoup(html, "html.parser")
+    return [str(link.get("href", "")) for link in soup.select("a.result__a")]
+
+
+_DDG_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/125.0.0.0 Safari/537.36"
+    ),
+}
+
+# 模块级复用的 requests.Session — 保持 TCP/TLS 连接，
+# 避免每次查询都重新付一次握手开销（~200-400ms）
+_ddg_session: Optional[requests.Session] = None
+
+
+def _get_ddg_session() -> requests.Session:
+    """获取或创建用于 DDG 搜索的长连接 Session。"""
+    global _ddg_session
+    if _ddg_session is None:
+        import atexit
+        from requests.adapters import HTTPAdapter
+
+        _ddg_session = requests.Session()
+        _ddg_session.headers.update(_DDG_HEADERS)
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+        _ddg_session.mount("https://", adapter)
+        _ddg_session.mount("http://", adapter)
+        atexit.register(_ddg_session.close)
+    return _ddg_session
+
+
+def _filter_ddg_links(hrefs: list, num_results: int) -> list:
+    """从 DDG 结果链接中解码真实 URL 并去重。"""
     urls: list[str] = []
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/125.0.0.0 Safari/537.36"
-        ),
-    }
+    seen: set[str] = set()
+
+    for href in hrefs:
+        if "uddg=" in href:
+            # 直接按分隔符切出 uddg 参数值，免去正则/解析器开销
+            raw = href.partition("uddg=")[2].partition("&")[0]
+            if raw:
+                real_url = unquote(raw)
+                if "duckduckgo.com/y.js" in real_url:
+                    continue
+                if real_url not in seen:
+                    seen.add(real_url)
+                    urls.append(real_url)
+        elif href.startswith("http"):
+            if "duckduckgo.com" not in href and href not in seen:
+                seen.add(href)
+                urls.append(href)
+
+        if len(urls) >= num_results:
+            break
 
+    return urls[:num_results]
+
+
+def _duckduckgo_search(query: str, num_results: int = 10) -> list:
+    """通过 DuckDuckGo HTML 版搜索获取 URL（国内可直接访问）。"""
     try:
-        resp = requests.get(
+        resp = _get_ddg_session().get(
             "https://html.duckduckgo.com/html/",
             params={"q": query},
-            headers=headers,
             timeout=15,
         )
         resp.raise_for_status()
@@ -378,27 +510,25 @@ def _duckduckgo_search(query: str, num_results: int = 10) -> list:
         print(f"[DDG] [WARN] 请求失败: {e}")
         return []
 
-    soup = BeautifulSoup(resp.text, "html.parser")
+    return _filter_ddg_links(_extract_ddg_links(resp.text), num_results)
 
-    for link in soup.select("a.result__a"):
-        href = str(link.get("href", ""))
-        if "uddg=" in href:
-            qs = parse_qs(urlparse(href).query)
-            real_urls = qs.get("uddg", [])
-            if real_urls:
-                real_url = unquote(real_urls[0])
-                if "duckduckgo.com/y.js" in real_url:
-                    continue
-                if real_url not in urls:
-                    urls.append(real_url)
-        elif href.startswith("http"):
-            if "duckduckgo.com" not in href and href not in urls:
-                urls.append(href)
 
-        if len(urls) >= num_results:
-            break
+async def _async_duckduckgo_search(session, query: str, num_results: int = 10) -> list:
+    """_duckduckgo_search 的 aiohttp 版本（供并发搜索使用）。"""
+    try:
+        timeout = aiohttp.ClientTimeout(total=15)
+        async with session.get(
+            "https://html.duckduckgo.com/html/",
+            params={"q": query},
+            timeout=timeout,
+        ) as resp:
+            resp.raise_for_status()
+            text = await resp.text()
+    except Exception as e:
+        print(f"[DDG] [WARN] 请求失败: {e}")
+        return []
 
-    return urls[:num_results]
+    return _filter_ddg_links(_extract_ddg_links(text), num_results)
 
 
 def _get_target_urls(category: str, num_results: Optional[int] = None) -> list:
@@ -408,6 +538,7 @@ def _get_target_urls(category: str, num_results: Optional[int] = None) -> list:
 
     queries = config.SEARCH_QUERIES.get(category, [])
     urls: list[str] = []
+    seen: set[str] = set()
 
     engine = config.SEARCH_ENGINE.lower()
     engine_names = {"google": "Google", "bing": "Bing", "duckduckgo": "DuckDuckGo"}
@@ -427,7 +558,8 @@ def _get_target_urls(category: str, num_results: Optional[int] = None) -> list:
                 results = _duckduckgo_search(query, num_results=10)
 
             for url in results:
-                if url not in urls:
+                if url not in seen:
+                    seen.add(url)
                     urls.append(url)
                 if len(urls) >= num_results:
                     break
@@ -451,6 +583,94 @@ def _get_target_urls(category: str, num_results: Optional[int] = None) -> list:
     return []
 
 
+async def _async_search_category(session, category: str, num_results: int,
+                                 sem: asyncio.Semaphore, limiter: HostLimiter) -> list:
+    """
+    并发执行单个类别的全部查询并聚合结果。
+
+    单个查询间不再串行等待 SEARCH_INTERVAL——并发度由
+    Semaphore 与 HostLimiter 共同约束（DDG 同属一个主机，
+    PER_HOST_DELAY 保证对引擎的请求间隔）。
+    """
+    queries = config.SEARCH_QUERIES.get(category, [])
+    # 保持查询序号的确定性归属
+    query_results: dict[int, list] = {}
+
+    async def _one(q_idx: int, query: str):
+        async with sem:
+            await limiter.wait("https://html.duckduckgo.com/html/")
+            query_results[q_idx] = await _async_duckduckgo_search(
+                session, query, num_results=10
+            )
+
+    await asyncio.gather(*[_one(i, q) for i, q in enumerate(queries)])
+
+    # 按原查询顺序聚合、去重、截断
+    urls: list[str] = []
+    seen: set[str] = set()
+    for i in range(len(queries)):
+        for url in query_results.get(i, []):
+            if url not in seen:
+                seen.add(url)
+                urls.append(url)
+        if len(urls) >= num_results:
+            break
+
+    print(f"[Crawler] {category}: 并发搜索获取 {min(len(urls), num_results)} 个 URL")
+    return urls[:num_results]
+
+
+async def _async_search_all_categories(num_results: int) -> dict:
+    """DDG 引擎下并发执行所有类别的全部查询，返回 {category: [url, ...]}。"""
+    sem = asyncio.Semaphore(5)
+    limiter = HostLimiter()
+
+    async with aiohttp.ClientSession(headers=_DDG_HEADERS) as session:
+        results = await asyncio.gather(*[
+            _async_search_category(session, cat, num_results, sem, limiter)
+            for cat in config.DOMAINS
+        ])
+
+    return dict(zip(config.DOMAINS, results))
+
+
+def _get_all_target_urls() -> dict:
+    """
+    为所有类别获取目标 URL。
+
+    DuckDuckGo 引擎（纯 HTTP）下各类别的查询并发执行；
+    Google / Bing 共享一个可见浏览器，保持串行。
+    """
+    engine = config.SEARCH_ENGINE.lower()
+
+    if engine == "duckduckgo" and aiohttp is not None:
+        print(f"[Crawler] 使用 DuckDuckGo 并发搜索 {len(config.DOMAINS)} 个类别...")
+        return asyncio.run(_async_search_all_categories(config.NUM_REAL_PAGES))
+
+    return {category: _get_target_urls(category) for category in config.DOMAINS}
+
+
+# ============================================================
+# 优雅退出（SIGINT）
+# ============================================================
+# Ctrl+C 时：置位关停标志、终止所有存活的 single-file 子进程，
+# 让 run_crawler 跳出下载循环并在 finally 中落盘已有进度。
+
+_active_procs: set = set()   # 存活的 single-file 子进程
+_shutdown = False            # 关停标志，工作线程/协程据此提前退出
+
+
+def _handle_sigint(signum, frame):
+    """SIGINT 处理：标记关停并清理子进程，不再硬性中断主线程。"""
+    global _shutdown
+    if _shutdown:
+        return
+    _shutdown = True
+    print("\n[Crawler] 收到 Ctrl+C，正在终止下载并保存进度...")
+    for proc in list(_active_procs):
+        _kill_proc_tree(proc)
+
+
 # ============================================================
 # 单页下载
 # ============================================================
@@ -464,6 +684,9 @@ def download_page(url: str, output_path: str) -> bool:
     ]
 
     for attempt in range(1, config.MAX_RETRIES + 1):
+        if _shutdown:
+            return False
+
         proc = None
         try:
             print(f"[Crawler] 下载中 (尝试 {attempt}/{config.MAX_RETRIES}): {url}")
@@ -475,6 +698,7 @@ def download_page(url: str, output_path: str) -> bool:
                 stderr=subprocess.DEVNULL,
                 creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if _IS_WINDOWS else 0,
             )
+            _active_procs.add(proc)
 
             try:
                 proc.wait(timeout=config.DOWNLOAD_TIMEOUT)
@@ -501,6 +725,8 @@ def download_page(url: str, output_path: str) -> bool:
             print(f"[Crawler] [FAIL] 异常: {e}")
             if proc is not None:
                 _kill_proc_tree(proc)
+        finally:
+            _active_procs.discard(proc)
 
         if attempt < config.MAX_RETRIES:
             time.sleep(config.REQUEST_DELAY)
@@ -530,36 +756,529 @@ def _kill_proc_tree(proc: subprocess.Popen):
         pass
 
 
+# ============================================================
+# 已见 URL 数据库（跨运行去重）
+# ============================================================
+# 把每个 URL 的处理结果持久化到 SQLite，重启后直接跳过已成功
+# 的 URL，省去重复的搜索/下载（也减少触发人机验证的机会）。
+
+def _open_seen_db() -> sqlite3.Connection:
+    """打开（必要时创建）已见 URL 数据库。"""
+    os.makedirs(os.path.dirname(config.SEEN_URLS_DB), exist_ok=True)
+    conn = sqlite3.connect(config.SEEN_URLS_DB)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS seen(url TEXT PRIMARY KEY, status TEXT, ts REAL)"
+    )
+    return conn
+
+
+def _load_seen_success(conn: sqlite3.Connection) -> set:
+    """返回历次运行中已成功下载的 URL 集合。"""
+    rows = conn.execute("SELECT url FROM seen WHERE status='success'").fetchall()
+    return {r[0] for r in rows}
+
+
+def _mark_seen(conn: sqlite3.Connection, urls: list, status: str):
+    """批量写入 URL 处理结果（单次 executemany + commit）。"""
+    if not urls:
+        return
+    now = time.time()
+    conn.executemany(
+        "INSERT OR REPLACE INTO seen(url, status, ts) VALUES (?, ?, ?)",
+        [(u, status, now) for u in urls],
+    )
+    conn.commit()
+
+
+# ============================================================
+# 异步批量下载（aiohttp 协程池）
+# ============================================================
+# 绝大多数页面是纯网络 I/O，直接用 aiohttp 抓取 HTML 即可，
+# 无需为每个 URL 启动一个 headless Chromium（single-file-cli）。
+# 仅当响应过小 (<1KB) 或非 HTML（通常意味着需要 JS 渲染）时，
+# 才回退到 download_page 的 single-file 子进程路径。
+
+# 小于该字节数的响应视为"需要 JS 渲染"，回退 single-file
+_MIN_HTML_BYTES = 1024
+
+# 流式写入的分块大小——大页面（新闻/电商常 >5MB）不再整页驻留内存
+_CHUNK_BYTES = 64 * 1024
+
+
+class AdaptiveSemaphore:
+    """
+    AIMD（加性增/乘性减）自适应并发控制。
+
+    固定的 CONCURRENT_DOWNLOADS 只是静态猜测：网络快时吃不满带宽，
+    网络差时放大重试开销。这里模仿 TCP 拥塞控制——每连续若干次
+    成功就把并发上限 +1，一旦出现超时/5xx 立刻减半。
+    仅在单个事件循环内使用，无需线程锁。
+    """
+
+    MIN_PERMITS = 2
+    MAX_PERMITS = 64
+    RAISE_EVERY = 5   # 每 N 次成功提升一次并发
+
+    def __init__(self, initial: int):
+        self._sem = asyncio.Semaphore(initial)
+        self.target = initial      # 期望并发
+        self._current = initial    # 已发放的许可总数
+        self._debt = 0             # 待吸收（释放时不归还）的许可数
+        self._successes = 0
+
+    async def __aenter__(self):
+        await self._sem.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._debt > 0:
+            # 并发上限刚被调低：吞掉这个许可，不归还
+            self._debt -= 1
+            self._current -= 1
+        else:
+            self._sem.release()
+
+    def record_success(self):
+        """成功一次；每 RAISE_EVERY 次成功将并发上限 +1。"""
+        self._successes += 1
+        if self._successes % self.RAISE_EVERY == 0 and self.target < self.MAX_PERMITS:
+            self.target += 1
+            if self.target > self._current:
+                self._current += 1
+                self._sem.release()
+
+    def record_failure(self):
+        """超时/5xx：并发上限减半（乘性减）。"""
+        self.target = max(self.MIN_PERMITS, self.target // 2)
+        # 还需吸收的许可数 = 已发放 - 期望（重复失败时直接覆盖，避免重复累计）
+        self._debt = max(0, self._current - self.target)
+        print(f"[Crawler] [AIMD] 并发上限下调至 {self.target}")
+
+
+class HostLimiter:
+    """
+    按主机名限速的礼貌调度器（per-host politeness）。
+
+    并发下载时多个任务可能落在同一主机（如 nike.com），全局
+    REQUEST_DELAY 无法防止对单一主机的瞬时轰炸。这里为每个
+    host 记录下一次允许请求的时刻，不同主机互不等待。
+    """
+
+    def __init__(self, per_host_delay: float = None):
+        if per_host_delay is None:
+            per_host_delay = config.PER_HOST_DELAY
+        self.per_host_delay = per_host_delay
+        self.next_ok: dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str):
+        """在请求 url 之前调用，必要时休眠到该主机的下一个允许时刻。"""
+        host = urlparse(url).netloc
+
+        async with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.next_ok.get(host, 0.0) - now)
+            # 先占住下一个时间槽，再在锁外休眠，避免阻塞其他主机
+            self.next_ok[host] = max(now, self.next_ok.get(host, 0.0)) + self.per_host_delay
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+async def _async_download(session, url: str, output_path: str,
+                          adapter: Optional[AdaptiveSemaphore] = None) -> bool:
+    """
+    使用 aiohttp 下载单个页面。
+
+    参数:
+        adapter : 可选的 AIMD 并发控制器，超时/5xx 时触发减半
+
+    返回:
+        True  = 已成功写入 output_path
+        False = 需要回退 single-file（响应过小 / 非 HTML / 请求失败）
+    """
+    try:
+        timeout = aiohttp.ClientTimeout(total=config.DOWNLOAD_TIMEOUT)
+        async with session.get(url, timeout=timeout, allow_redirects=True) as resp:
+            if resp.status != 200:
+                print(f"[Crawler] [WARN] HTTP {resp.status}: {url}")
+                if adapter is not None and resp.status >= 500:
+                    adapter.record_failure()
+                return False
+
+            content_type = resp.headers.get("Content-Type", "").lower()
+            if "html" not in content_type:
+                print(f"[Crawler] [WARN] 非 HTML 响应 ({content_type}): {url}")
+                return False
+
+            # 分块流式写入 .tmp：单个下载的常驻内存被限制在一个
+            # chunk 以内，而不是整个页面
+            tmp_path = output_path + ".tmp"
+            total = 0
+            if aiofiles is not None:
+                async with aiofiles.open(tmp_path, "wb") as f:
+                    async for chunk in resp.content.iter_chunked(_CHUNK_BYTES):
+                        await f.write(chunk)
+                        total += len(chunk)
+            else:
+                with open(tmp_path, "wb") as f:
+                    async for chunk in resp.content.iter_chunked(_CHUNK_BYTES):
+                        f.write(chunk)
+                        total += len(chunk)
+    except Exception as e:
+        print(f"[Crawler] [WARN] aiohttp 请求失败 ({e}): {url}")
+        if adapter is not None:
+            adapter.record_failure()
+        return False
+
+    if adapter is not None:
+        adapter.record_success()
+
+    if total < _MIN_HTML_BYTES:
+        # 页面过小，多半是需要 JS 渲染的壳页面
+        print(f"[Crawler] [WARN] 响应过小 ({total} bytes)，回退 single-file: {url}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+    # 原子 rename，防止中断产生半截文件
+    os.replace(tmp_path, output_path)
+
+    print(f"[Crawler] 下载成功 (aiohttp): {os.path.basename(output_path)} ({total:,} bytes)")
+    return True
+
+
+# aiohttp 下载会话的通用请求头（与 single-file 保持一致的桌面 UA）
+_DOWNLOAD_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/125.0.0.0 Safari/537.36"
+    ),
+}
+
+
+async def _run_async_downloads(tasks: list, on_success=None) -> dict:
+    """
+    并发执行所有 aiohttp 下载任务。
+
+    参数:
+        tasks      : [(category, filename, url, output_path), ...]
+        on_success : 可选回调 (category, filename, url)，每个任务
+                     成功后立即调用（用于增量持久化）
+
+    返回:
+        {(category, filename): bool} — True 表示已下载成功，
+        False 表示需要回退 single-file。
+    """
+    sem = AdaptiveSemaphore(config.CONCURRENT_DOWNLOADS)
+    limiter = HostLimiter()
+    results: dict = {}
+
+    async def _bounded(task: tuple):
+        cat, fname, url, out_path = task
+        if _shutdown:
+            results[(cat, fname)] = False
+            return
+        async with sem:
+            await limiter.wait(url)
+            ok = await _async_download(session, url, out_path, adapter=sem)
+        results[(cat, fname)] = ok
+        if ok and on_success is not None:
+            on_success(cat, fname, url)
+
+    connector = aiohttp.TCPConnector(
+        limit=config.CONCURRENT_DOWNLOADS,
+        limit_per_host=2,
+    )
+    async with aiohttp.ClientSession(
+        connector=connector, headers=_DOWNLOAD_HEADERS
+    ) as session:
+        await asyncio.gather(*[_bounded(t) for t in tasks])
+
+    return results
+
+
+async def _pipeline_search_and_download(mapping_db, seen_success: set, stats: dict,
+                                        on_success=None) -> tuple:
+    """
+    搜索 → 下载流水线（DDG 引擎 + aiohttp）。
+
+    每个类别的搜索一结束，其下载任务就立即推入有界队列
+    （maxsize=CONCURRENT_DOWNLOADS*2），下载协程并行消费——
+    无需等全部搜索完成，搜索阶段与下载阶段完全重叠。
+    有界队列同时对生产者形成背压，避免任务无限堆积。
+
+    返回:
+        (results, tasks, skipped)
+        results : {(category, filename): bool}
+        tasks   : 所有实际入队的任务（供回退阶段核对）
+        skipped : 断点续传跳过的任务数
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=config.CONCURRENT_DOWNLOADS * 2)
+
+    search_sem = asyncio.Semaphore(5)
+    search_limiter = HostLimiter()
+    dl_sem = AdaptiveSemaphore(config.CONCURRENT_DOWNLOADS)
+    dl_limiter = HostLimiter()
+
+    results: dict = {}
+    all_tasks: list = []
+    skipped_count = 0
+
+    async def _produce(search_session, category: str):
+        """单类别生产者：搜索完成后即时构建任务并入队。"""
+        nonlocal skipped_count
+        urls = await _async_search_category(
+            search_session, category, config.NUM_REAL_PAGES,
+            search_sem, search_limiter,
+        )
+        tasks, skipped = _build_category_tasks(
+            category, urls, mapping_db, seen_success, stats
+        )
+        skipped_count += skipped
+        for task in tasks:
+            all_tasks.append(task)
+            await queue.put(task)
+
+    async def _consume(dl_session):
+        """下载消费者：循环取任务直到收到 None 哨兵。"""
+        while True:
+            task = await queue.get()
+            if task is None:
+                queue.task_done()
+                return
+            cat, fname, url, out_path = task
+            if _shutdown:
+                results[(cat, fname)] = False
+            else:
+                async with dl_sem:
+                    await dl_limiter.wait(url)
+                    ok = await _async_download(dl_session, url, out_path,
+                                               adapter=dl_sem)
+                results[(cat, fname)] = ok
+                if ok and on_success is not None:
+                    on_success(cat, fname, url)
+            queue.task_done()
+
+    connector = aiohttp.TCPConnector(
+        limit=config.CONCURRENT_DOWNLOADS,
+        limit_per_host=2,
+    )
+    async with aiohttp.ClientSession(headers=_DDG_HEADERS) as search_session, \
+            aiohttp.ClientSession(
+                connector=connector, headers=_DOWNLOAD_HEADERS
+            ) as dl_session:
+        consumers = [
+            asyncio.ensure_future(_consume(dl_session))
+            for _ in range(config.CONCURRENT_DOWNLOADS)
+        ]
+        await asyncio.gather(*[
+            _produce(search_session, cat) for cat in config.DOMAINS
+        ])
+        # 所有生产者结束后投放哨兵，让消费者排空队列后退出
+        for _ in consumers:
+            await queue.put(None)
+        await asyncio.gather(*consumers)
+
+    return results, all_tasks, skipped_count
+
+
+# ============================================================
+# Playwright 渲染下载（JS 页面，进程内浏览器池）
+# ============================================================
+# aiohttp 拿不到的 JS 渲染页面，优先用一个长驻的 Playwright
+# Chromium 渲染（每个任务一个轻量 context），只有 Playwright
+# 不可用或仍失败时才回退 single-file-cli 子进程。
+
+async def _playwright_download_all(tasks: list) -> dict:
+    """
+    用单个 Playwright 浏览器并发渲染并保存所有任务。
+
+    参数:
+        tasks : [(category, filename, url, output_path), ...]
+
+    返回:
+        {(category, filename): bool}
+    """
+    sem = asyncio.Semaphore(config.CONCURRENT_DOWNLOADS)
+    results: dict = {}
+
+    async def _render(browser, task: tuple):
+        cat, fname, url, out_path = task
+        async with sem:
+            ctx = None
+            try:
+                ctx = await browser.new_context()
+                page = await ctx.new_page()
+                await page.goto(url, timeout=config.DOWNLOAD_TIMEOUT * 1000)
+                html = await page.content()
+            except Exception as e:
+                print(f"[Crawler] [WARN] Playwright 渲染失败 ({e}): {url}")
+                results[(cat, fname)] = False
+                return
+            finally:
+                if ctx is not None:
+                    try:
+                        await ctx.close()
+                    except Exception:
+                        pass
+
+        data = html.encode("utf-8")
+        if len(data) < _MIN_HTML_BYTES:
+            results[(cat, fname)] = False
+            return
+
+        tmp_path = out_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, out_path)
+        print(f"[Crawler] 下载成功 (Playwright): {fname} ({len(data):,} bytes)")
+        results[(cat, fname)] = True
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            await asyncio.gather(*[_render(browser, t) for t in tasks])
+        finally:
+            await browser.close()
+
+    return results
+
+
 # ============================================================
 # URL 映射表
 # ============================================================
-def _load_url_mapping() -> dict:
-    if os.path.exists(config.URL_MAPPING_FILE):
+class UrlMappingDB:
+    """
+    URL 映射的 SQLite 存储（WAL 模式）。
+
+    旧实现每次保存都整表 json.dump（O(N log N) 排序 + 全量序列化），
+    且半截写入会损坏文件。WAL 模式下每条成功是一次 O(1) 的
+    INSERT OR REPLACE，崩溃安全。下游（Phase 5）仍读 JSON，
+    因此运行结束时导出一份 url_mapping.json。
+    """
+
+    def __init__(self, path: str = None):
+        if path is None:
+            path = config.URL_MAPPING_DB
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS mapping(rel_key TEXT PRIMARY KEY, url TEXT, ts REAL)"
+        )
+        self._import_legacy_json()
+
+    def _import_legacy_json(self):
+        """把旧版 url_mapping.json 中尚未入库的条目迁移进来。"""
+        if not os.path.exists(config.URL_MAPPING_FILE):
+            return
         try:
             with open(config.URL_MAPPING_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
+                legacy = json.load(f)
         except (json.JSONDecodeError, IOError):
-            pass
-    return {}
+            return
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO mapping(rel_key, url, ts) VALUES (?, ?, ?)",
+            [(k, v, now) for k, v in legacy.items()],
+        )
+        self.conn.commit()
 
+    def put(self, rel_key: str, url: str):
+        """写入/更新一条映射（O(1)，每次成功下载后调用）。"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO mapping(rel_key, url, ts) VALUES (?, ?, ?)",
+            (rel_key, url, time.time()),
+        )
+        self.conn.commit()
+
+    def load(self) -> dict:
+        """读出全部映射为 dict。"""
+        rows = self.conn.execute("SELECT rel_key, url FROM mapping").fetchall()
+        return {k: v for k, v in rows}
+
+    def export_json(self):
+        """导出 url_mapping.json 供下游（Phase 5 元数据汇总）使用。"""
+        mapping = self.load()
+        if orjson is not None:
+            with open(config.URL_MAPPING_FILE, "wb") as f:
+                f.write(orjson.dumps(
+                    mapping, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+                ))
+        else:
+            with open(config.URL_MAPPING_FILE, "w", encoding="utf-8") as f:
+                json.dump(mapping, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"[Crawler] URL 映射已导出 ({len(mapping)} 条)")
 
-def _save_url_mapping(mapping: dict):
-    os.makedirs(os.path.dirname(config.URL_MAPPING_FILE), exist_ok=True)
-    with open(config.URL_MAPPING_FILE, "w", encoding="utf-8") as f:
-        json.dump(mapping, f, ensure_ascii=False, indent=2, sort_keys=True)
-    print(f"[Crawler] URL 映射已保存 ({len(mapping)} 条)")
+    def close(self):
+        self.conn.close()
 
 
 # ============================================================
 # 主调度（并发下载）
 # ============================================================
+def _build_category_tasks(category: str, urls: list, mapping_db,
+                          seen_success: set, stats: dict) -> tuple:
+    """
+    为单个类别构建下载任务列表（断点续传跳过已有文件 / 已成功 URL）。
+
+    返回:
+        (tasks, skipped)
+        tasks   : [(category, filename, url, output_path), ...]
+        skipped : 跳过的任务数
+    """
+    category_dir = os.path.join(config.RAW_HTML_DIR, category)
+    os.makedirs(category_dir, exist_ok=True)
+
+    stats[category] = {"success": 0, "fail": 0}
+    tasks: list = []
+    skipped = 0
+
+    if not urls:
+        return tasks, skipped
+
+    # 一次 scandir 建立"文件名 → 大小"索引，替代逐文件的
+    # exists + getsize 双重 stat 调用（网络盘上尤其划算）
+    existing = {
+        e.name: e.stat().st_size
+        for e in os.scandir(category_dir) if e.is_file()
+    }
+
+    for idx, url in enumerate(urls):
+        filename = f"{category.lower()}_real_{idx + 1}.html"
+        output_path = os.path.join(category_dir, filename)
+        rel_key = f"{category}/{filename}"
+
+        if existing.get(filename, 0) > 100:
+            print(f"[Crawler] [SKIP] 已存在: {filename}")
+            mapping_db.put(rel_key, url)
+            stats[category]["success"] += 1
+            skipped += 1
+        elif url in seen_success:
+            # 历次运行已成功下载过（文件可能已被移动/打包），不再重试
+            print(f"[Crawler] [SEEN] 跳过已成功 URL: {url}")
+            skipped += 1
+        else:
+            tasks.append((category, filename, url, output_path))
+
+    return tasks, skipped
+
+
 def run_crawler() -> dict:
     """
     爬虫主调度：
-      1. 先为所有类别收集 URL 并构建下载任务列表
+      1. 为所有类别收集 URL 并构建下载任务列表
+         （DDG 引擎下搜索与下载经有界队列流水线重叠执行）
       2. 跳过已存在的文件（断点续传）
-      3. 使用 ThreadPoolExecutor 并发下载
-      4. 完成后关闭搜索浏览器
+      3. 使用 aiohttp 协程池并发下载（纯网络 I/O，无子进程开销）
+      4. 需要 JS 渲染的任务交给长驻 Playwright 浏览器池
+      5. 仍失败的任务回退 single-file-cli (ThreadPoolExecutor)
+      6. 完成后关闭搜索浏览器
     """
     from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -567,79 +1286,161 @@ def run_crawler() -> dict:
     print(f"Phase 0: 真实网页采集 (并发数={config.CONCURRENT_DOWNLOADS})")
     print("=" * 60)
 
-    url_mapping = _load_url_mapping()
+    mapping_db = UrlMappingDB()
     stats: dict[str, dict[str, int]] = {}
 
+    # 跨运行去重：加载历次已成功的 URL 集合
+    seen_db = _open_seen_db()
+    seen_success = _load_seen_success(seen_db)
+    if seen_success:
+        print(f"[Crawler] 已见 URL 数据库: {len(seen_success)} 条成功记录")
+
     # ---------- 1. 收集所有下载任务 ----------
     tasks: list[tuple[str, str, str, str]] = []  # (category, filename, url, output_path)
     skipped = 0
 
-    for category in config.DOMAINS:
-        category_dir = os.path.join(config.RAW_HTML_DIR, category)
-        os.makedirs(category_dir, exist_ok=True)
-
-        print(f"\n--- 类别: {category} ---")
-        urls = _get_target_urls(category)
-        if not urls:
-            stats[category] = {"success": 0, "fail": 0}
-            continue
-
-        stats[category] = {"success": 0, "fail": 0}
+    # DDG 引擎（纯 HTTP）下搜索与下载通过有界队列流水线重叠执行，
+    # 任务由生产者协程即时构建；Google / Bing 仍先收集后下载。
+    use_pipeline = config.SEARCH_ENGINE.lower() == "duckduckgo" and aiohttp is not None
 
-        for idx, url in enumerate(urls):
-            filename = f"{category.lower()}_real_{idx + 1}.html"
-            output_path = os.path.join(category_dir, filename)
-            rel_key = f"{category}/{filename}"
+    if not use_pipeline:
+        urls_by_category = _get_all_target_urls()
 
-            if os.path.exists(output_path) and os.path.getsize(output_path) > 100:
-                print(f"[Crawler] [SKIP] 已存在: {filename}")
-                url_mapping[rel_key] = url
-                stats[category]["success"] += 1
-                skipped += 1
-            else:
-                tasks.append((category, filename, url, output_path))
-
-    pending = len(tasks)
-    print(f"\n[Crawler] 任务汇总: {pending} 待下载, {skipped} 已跳过")
-
-    if not tasks:
-        _save_url_mapping(url_mapping)
-        return stats
-
-    # ---------- 2. 并发下载 ----------
-    completed = 0
-
-    def _do_download(task: tuple) -> tuple:
-        """线程工作函数，返回 (category, rel_key, url, success)。"""
-        cat, fname, url, out_path = task
-        rel_key = f"{cat}/{fname}"
-        ok = download_page(url, out_path)
-        return (cat, rel_key, url, ok)
+        for category in config.DOMAINS:
+            print(f"\n--- 类别: {category} ---")
+            cat_tasks, cat_skipped = _build_category_tasks(
+                category, urls_by_category.get(category, []),
+                mapping_db, seen_success, stats,
+            )
+            tasks.extend(cat_tasks)
+            skipped += cat_skipped
 
-    with ThreadPoolExecutor(max_workers=config.CONCURRENT_DOWNLOADS) as pool:
-        futures = {pool.submit(_do_download, t): t for t in tasks}
+        print(f"\n[Crawler] 任务汇总: {len(tasks)} 待下载, {skipped} 已跳过")
 
-        for future in as_completed(futures):
-            completed += 1
-            try:
-                cat, rel_key, url, ok = future.result()
-            except Exception as e:
-                cat = futures[future][0]
-                print(f"[Crawler] [FAIL] 线程异常: {e}")
-                stats[cat]["fail"] += 1
-                continue
+        if not tasks:
+            mapping_db.export_json()
+            mapping_db.close()
+            seen_db.close()
+            return stats
 
-            if ok:
-                url_mapping[rel_key] = url
-                stats[cat]["success"] += 1
-            else:
-                stats[cat]["fail"] += 1
+    success_urls: list[str] = []
+    fail_urls: list[str] = []
 
-            print(f"[Crawler] 进度: {completed}/{pending}")
+    def _on_success(cat: str, fname: str, url: str):
+        # 每条成功立即入库，Ctrl+C 不丢已完成的映射
+        mapping_db.put(f"{cat}/{fname}", url)
 
-    _save_url_mapping(url_mapping)
+    # 注册 SIGINT：Ctrl+C 时终止子进程、跳出循环并保存进度
+    global _shutdown
+    _shutdown = False
+    prev_sigint = signal.signal(signal.SIGINT, _handle_sigint)
 
-    # ---------- 3. 打印汇总 ----------
+    try:
+        # ---------- 2. 异步批量下载 (aiohttp) ----------
+        # 先用 aiohttp 协程池抓取纯静态页面，失败/需要 JS 渲染的
+        # 任务收集起来，再回退 single-file-cli 子进程路径。
+        fallback_tasks: list[tuple[str, str, str, str]] = tasks
+        async_results = None
+
+        if use_pipeline:
+            # 流水线模式：搜索与下载重叠，任务在生产者侧即时构建
+            print(f"[Crawler] 搜索-下载流水线启动"
+                  f"（队列上限 {config.CONCURRENT_DOWNLOADS * 2}）...")
+            async_results, tasks, skipped = asyncio.run(
+                _pipeline_search_and_download(
+                    mapping_db, seen_success, stats, on_success=_on_success
+                )
+            )
+            print(f"\n[Crawler] 任务汇总: {len(tasks)} 待下载, {skipped} 已跳过")
+        elif aiohttp is not None:
+            async_results = asyncio.run(_run_async_downloads(tasks, on_success=_on_success))
+        else:
+            print("[Crawler] [WARN] aiohttp 未安装，全部使用 single-file 下载")
+
+        if async_results is not None:
+            fallback_tasks = []
+            for task in tasks:
+                cat, fname, url, out_path = task
+                if async_results.get((cat, fname)):
+                    stats[cat]["success"] += 1
+                    success_urls.append(url)
+                else:
+                    fallback_tasks.append(task)
+
+            done = len(tasks) - len(fallback_tasks)
+            print(f"\n[Crawler] aiohttp 完成 {done}/{len(tasks)}，"
+                  f"{len(fallback_tasks)} 个任务回退 single-file")
+
+        # ---------- 3. Playwright 渲染下载 (JS 页面，进程内浏览器池) ----------
+        if fallback_tasks and async_playwright is not None:
+            pw_results = asyncio.run(_playwright_download_all(fallback_tasks))
+
+            remaining = []
+            for task in fallback_tasks:
+                cat, fname, url, out_path = task
+                if pw_results.get((cat, fname)):
+                    _on_success(cat, fname, url)
+                    stats[cat]["success"] += 1
+                    success_urls.append(url)
+                else:
+                    remaining.append(task)
+
+            print(f"[Crawler] Playwright 完成 {len(fallback_tasks) - len(remaining)}/"
+                  f"{len(fallback_tasks)}，{len(remaining)} 个任务回退 single-file")
+            fallback_tasks = remaining
+
+        # ---------- 4. 回退下载 (single-file 子进程，最后手段) ----------
+        completed = 0
+
+        def _do_download(task: tuple) -> tuple:
+            """线程工作函数，返回 (category, rel_key, url, success)。"""
+            cat, fname, url, out_path = task
+            rel_key = f"{cat}/{fname}"
+            ok = download_page(url, out_path)
+            return (cat, rel_key, url, ok)
+
+        if fallback_tasks:
+            with ThreadPoolExecutor(max_workers=config.CONCURRENT_DOWNLOADS) as pool:
+                futures = {pool.submit(_do_download, t): t for t in fallback_tasks}
+
+                for future in as_completed(futures):
+                    if _shutdown:
+                        for f in futures:
+                            f.cancel()
+                        break
+                    completed += 1
+                    try:
+                        cat, rel_key, url, ok = future.result()
+                    except Exception as e:
+                        cat = futures[future][0]
+                        print(f"[Crawler] [FAIL] 线程异常: {e}")
+                        stats[cat]["fail"] += 1
+                        continue
+
+                    if ok:
+                        mapping_db.put(rel_key, url)
+                        stats[cat]["success"] += 1
+                        success_urls.append(url)
+                    else:
+                        stats[cat]["fail"] += 1
+                        fail_urls.append(url)
+
+                    print(f"[Crawler] 进度: {completed}/{len(fallback_tasks)}")
+    finally:
+        signal.signal(signal.SIGINT, prev_sigint)
+
+        mapping_db.export_json()
+        mapping_db.close()
+
+        # 持久化本次运行的 URL 处理结果（跨运行去重）
+        _mark_seen(seen_db, success_urls, "success")
+        _mark_seen(seen_db, fail_urls, "fail")
+        seen_db.close()
+
+        if _shutdown:
+            print("[Crawler] 已中断，进度已保存。")
+
+    # ---------- 5. 打印汇总 ----------
     total_success = sum(s["success"] for s in stats.values())
     total_fail = sum(s["fail"] for s in stats.values())
 
@@ -648,7 +1449,7 @@ def run_crawler() -> dict:
         print(f"  {cat:15s}: OK {s['success']:3d}  FAIL {s['fail']:3d}")
     print(f"  {'合计':15s}: OK {total_success:3d}  FAIL {total_fail:3d}")
 
-    # ---------- 4. 关闭搜索浏览器 ----------
+    # ---------- 6. 关闭搜索浏览器 ----------
     _close_search_driver()
 
     return stats
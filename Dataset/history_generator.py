@@ -10,30 +10,95 @@
 import random
 import string
 
+import numpy as np
+
 import config
 
+# 随机参数取值空间（模块级常量，批量采样时直接索引）
+_MAX_X = 1920
+_MAX_Y = 1080
+_CONTENT_LEN = 8
+_CONTENT_CHARS = np.array(list(string.ascii_lowercase + string.digits))
+_KEY_COMBOS = ["ctrl+c", "ctrl+v", "ctrl+a", "ctrl+z", "alt+tab", "ctrl+s", "enter", "escape"]
+_SCROLL_DIRS = ["up", "down", "left", "right"]
+
+# NumPy 批量采样 RNG（比逐次调用 random.* 摊薄分发开销）
+_RNG = np.random.default_rng()
+
+# 动作空间的预转换数组——类别采样后一次 fancy-index gather 取回模板
+_ACTION_ARR = np.array(config.ACTION_SPACE, dtype=object)
 
-def _random_coord(max_x: int = 1920, max_y: int = 1080) -> str:
+
+def _random_coord(max_x: int = _MAX_X, max_y: int = _MAX_Y) -> str:
     """生成一个随机坐标字符串 (x, y)。"""
     x = random.randint(0, max_x)
     y = random.randint(0, max_y)
     return f"({x}, {y})"
 
 
-def _random_content(length: int = 8) -> str:
+def _random_content(length: int = _CONTENT_LEN) -> str:
     """生成一个随机字符串，模拟用户键入内容。"""
     return "".join(random.choices(string.ascii_lowercase + string.digits, k=length))
 
 
 def _random_key_combo() -> str:
     """生成一个随机的快捷键组合。"""
-    combos = ["ctrl+c", "ctrl+v", "ctrl+a", "ctrl+z", "alt+tab", "ctrl+s", "enter", "escape"]
-    return random.choice(combos)
+    return random.choice(_KEY_COMBOS)
 
 
 def _random_scroll_direction() -> str:
     """生成一个随机的滚动方向。"""
-    return random.choice(["up", "down", "left", "right"])
+    return random.choice(_SCROLL_DIRS)
+
+
+# 占位符类型 → 随机值生成函数
+_PLACEHOLDER_GENS = {
+    "coord": _random_coord,
+    "key_comb": _random_key_combo,
+    "content": lambda: f'"{_random_content()}"',
+    "direction": _random_scroll_direction,
+}
+
+# 模板文本中的占位符书写形式（长 token 在前，避免 (x,y) 抢先匹配）
+_PLACEHOLDER_TOKENS = [
+    ("(x1,y1)", "coord"),
+    ("(x2,y2)", "coord"),
+    ("(x,y)", "coord"),
+    ("key_comb", "key_comb"),
+    ("content", "content"),
+    ("direction", "direction"),
+]
+
+
+def _compile_template(template: str) -> tuple:
+    """
+    把动作模板预编译为 (前缀文本, 占位符类型) 片段元组。
+
+    填充时只需顺序拼接前缀与生成值，不再做任何字符串查找。
+    """
+    segments: list = []
+    rest = template
+    while rest:
+        # 找最先出现的占位符
+        best = None
+        for token, kind in _PLACEHOLDER_TOKENS:
+            idx = rest.find(token)
+            if idx != -1 and (best is None or idx < best[0]):
+                best = (idx, token, kind)
+        if best is None:
+            segments.append((rest, None))
+            break
+        idx, token, kind = best
+        prefix = rest[:idx]
+        if prefix == ",":
+            prefix = ", "  # 与批量路径的输出格式保持一致
+        segments.append((prefix, kind))
+        rest = rest[idx + len(token):]
+    return tuple(segments)
+
+
+# 模板 → 预编译片段表（模块加载时构建一次）
+_COMPILED = {t: _compile_template(t) for t in config.ACTION_SPACE}
 
 
 def _fill_action(action_template: str) -> str:
@@ -46,35 +111,62 @@ def _fill_action(action_template: str) -> str:
     返回:
         带有具体参数的动作字符串
     """
-    # 需要单组坐标的动作: click, left_double, right_single
-    if action_template in ("click((x,y))", "left_double((x,y))", "right_single((x,y))"):
-        action_name = action_template.split("(")[0]
-        coord = _random_coord()
-        return f"{action_name}({coord})"
+    segments = _COMPILED.get(action_template)
+    if segments is None:
+        # 非 ACTION_SPACE 的外部模板：现场编译并缓存
+        segments = _compile_template(action_template)
+        _COMPILED[action_template] = segments
 
-    # 需要两组坐标的动作: drag
-    if action_template == "drag((x1,y1),(x2,y2))":
-        c1 = _random_coord()
-        c2 = _random_coord()
-        return f"drag({c1}, {c2})"
+    parts: list = []
+    for prefix, kind in segments:
+        parts.append(prefix)
+        if kind is not None:
+            parts.append(_PLACEHOLDER_GENS[kind]())
+    return "".join(parts)
 
-    # 需要快捷键组合: hotkey
-    if action_template == "hotkey(key_comb)":
-        combo = _random_key_combo()
-        return f"hotkey({combo})"
 
-    # 需要文本内容: type
-    if action_template == "type(content)":
-        content = _random_content()
-        return f'type("{content}")'
+def fill_actions_batch(templates: list) -> list:
+    """
+    批量填充动作模板（NumPy 向量化预采样）。
 
-    # 需要方向: scroll
-    if action_template == "scroll(direction)":
-        direction = _random_scroll_direction()
-        return f"scroll({direction})"
+    一次性为整批动作采样所有随机参数（坐标 / 快捷键 / 方向 / 文本），
+    把逐条 random.randint / random.choice 的解释器与 RNG 分发开销
+    摊薄到单次 NumPy 调用上。
 
-    # 无需额外参数: wait, finished, call_user
-    return action_template.replace("()", "()")
+    参数:
+        templates : 动作模板字符串列表（来自 config.ACTION_SPACE）
+
+    返回:
+        带有具体参数的动作字符串列表（与输入一一对应）
+    """
+    n = len(templates)
+    if n == 0:
+        return []
+
+    # 预采样：drag 需要两组坐标，统一采 2n 组
+    xs = _RNG.integers(0, _MAX_X + 1, size=2 * n)
+    ys = _RNG.integers(0, _MAX_Y + 1, size=2 * n)
+    combo_idx = _RNG.integers(0, len(_KEY_COMBOS), size=n)
+    dir_idx = _RNG.integers(0, len(_SCROLL_DIRS), size=n)
+    contents = _RNG.choice(_CONTENT_CHARS, size=(n, _CONTENT_LEN))
+
+    actions: list[str] = []
+    for i, template in enumerate(templates):
+        if template in ("click((x,y))", "left_double((x,y))", "right_single((x,y))"):
+            action_name = template.split("(")[0]
+            actions.append(f"{action_name}(({xs[i]}, {ys[i]}))")
+        elif template == "drag((x1,y1),(x2,y2))":
+            actions.append(f"drag(({xs[i]}, {ys[i]}), ({xs[n + i]}, {ys[n + i]}))")
+        elif template == "hotkey(key_comb)":
+            actions.append(f"hotkey({_KEY_COMBOS[combo_idx[i]]})")
+        elif template == "type(content)":
+            actions.append(f'type("{"".join(contents[i])}")')
+        elif template == "scroll(direction)":
+            actions.append(f"scroll({_SCROLL_DIRS[dir_idx[i]]})")
+        else:
+            # 无需额外参数: wait, finished, call_user
+            actions.append(template)
+    return actions
 
 
 # ============================================================
@@ -90,12 +182,20 @@ def generate_history(num_steps: int = 3) -> list:
     返回:
         动作字符串列表，例如 ["scroll(down)", "click((200, 300))", "wait()"]
     """
-    actions = []
-    for _ in range(num_steps):
-        template = random.choice(config.ACTION_SPACE)
-        filled = _fill_action(template)
-        actions.append(filled)
-    return actions
+    # 单序列也是批量路径的薄封装：一次类别采样 + 批量填充
+    template_idx = _RNG.integers(0, len(_ACTION_ARR), size=num_steps)
+    return fill_actions_batch(_ACTION_ARR[template_idx].tolist())
+
+
+def _generate_histories_batch(num_histories: int, steps_per_history: int) -> list:
+    """一次性采样并填充整批历史，再按步数切分为二维列表。"""
+    total = num_histories * steps_per_history
+    template_idx = _RNG.integers(0, len(_ACTION_ARR), size=total)
+    filled = fill_actions_batch(_ACTION_ARR[template_idx].tolist())
+    return [
+        filled[i * steps_per_history:(i + 1) * steps_per_history]
+        for i in range(num_histories)
+    ]
 
 
 def generate_shadow_histories(num_histories: int = None, steps_per_history: int = 3) -> list:
@@ -113,7 +213,7 @@ def generate_shadow_histories(num_histories: int = None, steps_per_history: int
     if num_histories is None:
         num_histories = config.NUM_SHADOW_HISTORY
 
-    histories = [generate_history(steps_per_history) for _ in range(num_histories)]
+    histories = _generate_histories_batch(num_histories, steps_per_history)
     print(f"[HistoryGen] 已生成 {num_histories} 条 Shadow History（每条 {steps_per_history} 步）。")
     return histories
 
@@ -133,6 +233,6 @@ def generate_user_histories(num_histories: int = None, steps_per_history: int =
     if num_histories is None:
         num_histories = config.NUM_USER_HISTORY
 
-    histories = [generate_history(steps_per_history) for _ in range(num_histories)]
+    histories = _generate_histories_batch(num_histories, steps_per_history)
     print(f"[HistoryGen] 已生成 {num_histories} 条 User History（每条 {steps_per_history} 步）。")
     return histories
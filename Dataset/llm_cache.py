@@ -0,0 +1,83 @@
+# ============================================================
+# llm_cache.py — LLM 调用结果的内容寻址磁盘缓存
+# ============================================================
+# OpenAI 调用是流水线里最贵的一环（网络 + 推理），且重跑时大量
+# 请求完全相同。按 SHA256(model|temperature|prompt) 寻址，命中
+# 直接返回磁盘上的 JSON blob；进程内再叠一层 LRU 吸收热点。
+#
+# 缓存布局: {LLM_CACHE_DIR}/{sha256[:2]}/{sha256}.json
+# ============================================================
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import config
+
+# 进程内 LRU（prompt → response），磁盘命中后的重复查询零 I/O。
+# phase 2 线程池并发读写：get 的 move_to_end 与 _mem_put 的逐出
+# 必须互斥，否则逐出夹在中间会抛 KeyError
+_MEM_CACHE: OrderedDict = OrderedDict()
+_MEM_CACHE_MAX = 1024
+_MEM_LOCK = threading.Lock()
+
+
+def _cache_key(model: str, temperature: float, prompt: str) -> str:
+    """内容寻址键：模型 + 采样温度 + 完整 prompt 的 SHA256。"""
+    payload = f"{model}|{temperature}|{prompt}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    # 两级目录避免单目录文件数过大
+    return os.path.join(config.LLM_CACHE_DIR, key[:2], f"{key}.json")
+
+
+def _mem_put(key: str, response: str):
+    with _MEM_LOCK:
+        _MEM_CACHE[key] = response
+        _MEM_CACHE.move_to_end(key)
+        while len(_MEM_CACHE) > _MEM_CACHE_MAX:
+            _MEM_CACHE.popitem(last=False)
+
+
+def get(model: str, temperature: float, prompt: str) -> Optional[str]:
+    """查缓存；未命中返回 None。"""
+    key = _cache_key(model, temperature, prompt)
+
+    with _MEM_LOCK:
+        cached = _MEM_CACHE.get(key)
+        if cached is not None:
+            _MEM_CACHE.move_to_end(key)
+            return cached
+
+    try:
+        with open(_cache_path(key), "r", encoding="utf-8") as f:
+            blob = json.load(f)
+        response = blob["response"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+    _mem_put(key, response)
+    return response
+
+
+def put(model: str, temperature: float, prompt: str, response: str):
+    """写入缓存（临时文件 + 原子 rename，失败时静默忽略）。"""
+    key = _cache_key(model, temperature, prompt)
+    path = _cache_path(key)
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"response": response, "ts": time.time()}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+    _mem_put(key, response)
@@ -3,43 +3,64 @@
 # ============================================================
 # 将所有 print / stderr 输出同时写入控制台和带时间戳的日志文件。
 # 每次运行自动生成独立日志文件，便于回溯和对比。
+#
+# 实现为 QueueHandler → QueueListener：print 只做非阻塞入队，
+# 真正的控制台/文件写盘在后台监听线程完成，日志 I/O 不再占用
+# 渲染/下载热路径。逐页噪声（[Render] / [ICC]）降级为 DEBUG，
+# 只进文件不上控制台。
 # ============================================================
 
 import datetime
+import io
+import logging
+import logging.handlers
 import os
+import queue
 import sys
 
+# 逐条渲染/变换的 chatty 前缀 → DEBUG（仅写入文件）
+_DEBUG_PREFIXES = ("[Render]", "[ICC]")
 
-class TeeStream:
-    """同时写入多个流的包装器。"""
 
-    def __init__(self, *streams):
-        self.streams = streams
+class LogStream:
+    """
+    替代 sys.stdout/stderr 的文件型适配器。
+
+    按行聚合 write 调用并转成 logging 入队操作——调用方（print）
+    不再等待任何磁盘/终端 I/O。
+    """
+
+    def __init__(self, log: logging.Logger, fallback):
+        self._log = log
+        self._fallback = fallback  # 原始流，供 fileno/isatty 委托
+        self._buf = ""
 
     def write(self, data: str):
-        for s in self.streams:
-            try:
-                s.write(data)
-                s.flush()
-            except Exception:
-                pass
+        self._buf += data
+        while "\n" in self._buf:
+            line, self._buf = self._buf.split("\n", 1)
+            level = (
+                logging.DEBUG
+                if line.startswith(_DEBUG_PREFIXES)
+                else logging.INFO
+            )
+            self._log.log(level, line)
 
     def flush(self):
-        for s in self.streams:
-            try:
-                s.flush()
-            except Exception:
-                pass
+        if self._buf:
+            self._log.info(self._buf)
+            self._buf = ""
 
     def fileno(self):
-        # 返回第一个流（控制台）的 fd，兼容部分库的 isatty() 检查
-        return self.streams[0].fileno()
+        # 返回原始流的 fd，兼容部分库的检查
+        return self._fallback.fileno()
 
     def isatty(self):
-        return hasattr(self.streams[0], "isatty") and self.streams[0].isatty()
+        return hasattr(self._fallback, "isatty") and self._fallback.isatty()
 
 
-_log_file = None  # 保持引用防止 GC
+_log_file = None   # 保持引用防止 GC
+_listener = None   # 后台写盘线程
 
 
 def setup_logging(log_dir: str) -> str:
@@ -54,27 +75,60 @@ def setup_logging(log_dir: str) -> str:
     返回:
         日志文件的绝对路径
     """
-    global _log_file
+    global _log_file, _listener
 
     os.makedirs(log_dir, exist_ok=True)
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     log_path = os.path.join(log_dir, f"pipeline_{timestamp}.log")
 
-    _log_file = open(log_path, "w", encoding="utf-8")
-
-    sys.stdout = TeeStream(sys.__stdout__, _log_file)  # type: ignore[assignment]
-    sys.stderr = TeeStream(sys.__stderr__, _log_file)  # type: ignore[assignment]
+    # 64 KiB BufferedWriter + 行缓冲 TextIOWrapper：整行聚合后一次
+    # write 落盘，长流水线里逐 token 的 print 不再逐次产生系统调用
+    raw = open(log_path, "wb")
+    buf = io.BufferedWriter(raw, buffer_size=65536)
+    _log_file = io.TextIOWrapper(buf, encoding="utf-8", line_buffering=True)
+
+    # 控制台只收 INFO 及以上；文件收 DEBUG（含逐页渲染噪声）
+    fmt = logging.Formatter("%(message)s")
+    console_handler = logging.StreamHandler(sys.__stdout__)
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(fmt)
+    file_handler = logging.StreamHandler(_log_file)
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(fmt)
+
+    # 生产侧非阻塞入队，消费侧单线程顺序写两个 sink
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+    log = logging.getLogger("pipeline")
+    log.setLevel(logging.DEBUG)
+    log.handlers.clear()
+    log.addHandler(logging.handlers.QueueHandler(log_queue))
+    log.propagate = False
+
+    sys.stdout = LogStream(log, sys.__stdout__)  # type: ignore[assignment]
+    sys.stderr = LogStream(log, sys.__stderr__)  # type: ignore[assignment]
 
     return log_path
 
 
 def shutdown_logging():
-    """恢复标准输出并关闭日志文件。"""
-    global _log_file
+    """恢复标准输出、排空日志队列并关闭日志文件。"""
+    global _log_file, _listener
 
     sys.stdout = sys.__stdout__
     sys.stderr = sys.__stderr__
 
+    if _listener is not None:
+        try:
+            _listener.stop()  # 排空队列后停止监听线程
+        except Exception:
+            pass
+        _listener = None
+
     if _log_file is not None:
         try:
             _log_file.close()
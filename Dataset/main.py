@@ -13,6 +13,7 @@
 #   cd Dataset && python main.py
 # ============================================================
 
+import functools
 import json
 import os
 import sys
@@ -23,6 +24,55 @@ import logger
 import pipeline_state
 import webpage_manager
 
+# 高性能 JSON 序列化（可选，缺失时回退标准库 json）
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 流水线产出 JSON 默认紧凑（机器消费）；人工检查时置
+# WEBINJECT_PRETTY_JSON=1 输出缩进格式
+_PRETTY_JSON = os.environ.get("WEBINJECT_PRETTY_JSON", "") == "1"
+
+
+def _fast_dump(obj, path: str):
+    """一次性序列化并写出 JSON 产出文件（优先 orjson）。"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if _PRETTY_JSON:
+            option |= orjson.OPT_INDENT_2
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(obj, option=option))
+        return
+
+    if _PRETTY_JSON:
+        text = json.dumps(obj, ensure_ascii=False, indent=2)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+@functools.lru_cache(maxsize=None)
+def _scan_png_dir_cached(dir_path: str, mtime_ns: int) -> dict:
+    # mtime_ns 仅作缓存键：目录有增删时 mtime 变化，自动失效重扫
+    return {e.name: e.stat().st_size for e in os.scandir(dir_path)}
+
+
+def _scan_png_dir(dir_path: str) -> dict:
+    """
+    一次 scandir 建立目录的"文件名 → 大小"索引。
+
+    结果按 (路径, 目录 mtime) 缓存，Phase 4 / Phase 5 先后查询
+    同一目录时不重复扫描，目录内容变化时自动重扫。
+    """
+    try:
+        mtime_ns = os.stat(dir_path).st_mtime_ns
+    except OSError:
+        return {}
+    return _scan_png_dir_cached(dir_path, mtime_ns)
+
+
 # ============================================================
 # Phase 0 — 真实网页采集
 # ============================================================
@@ -65,20 +115,21 @@ def phase1_synth(state: dict):
 # ============================================================
 # Phase 2 — Prompt 生成
 # ============================================================
-def phase2_prompts(state: dict):
+def phase2_prompts(state: dict, html_files: list):
     """为每个 HTML 页面生成 Target Prompts + User Prompts。"""
     phase = "phase2_prompts"
     if pipeline_state.is_completed(state, phase):
         print(f"\n[SKIP] {phase} 已完成，跳过。")
         return
 
+    from concurrent.futures import ThreadPoolExecutor
+
     import prompt_generator
 
     print("\n" + "=" * 60)
     print("Phase 2: Prompt 生成")
     print("=" * 60)
 
-    html_files = webpage_manager.list_html_files()
     if not html_files:
         print("[Phase2] [WARN] 未找到 HTML 文件，跳过。")
         pipeline_state.mark_completed(state, phase, {"count": 0})
@@ -86,19 +137,30 @@ def phase2_prompts(state: dict):
 
     all_prompts: dict[str, dict] = {}
 
-    for html_path in html_files:
-        rel_name = os.path.relpath(html_path, config.RAW_HTML_DIR)
+    def _gen(item: tuple) -> tuple:
+        """单页面的 Prompt 生成（线程工作函数，I/O 期间释放 GIL）。"""
+        html_path, rel_name = item
         target_prompts = prompt_generator.generate_target_prompts(html_path)
         user_prompts = prompt_generator.generate_user_prompts(target_prompts)
-        all_prompts[rel_name] = {
+        return rel_name, {
             "target_prompts": target_prompts,
             "user_prompts": user_prompts,
         }
 
+    # Prompt 生成以文件读取 + API/Mock 调用为主，线程池即可扩展
+    tasks = [
+        (html_path, os.path.relpath(html_path, config.RAW_HTML_DIR))
+        for html_path in html_files
+    ]
+    max_workers = min(32, 4 * (os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # map 保持输入顺序，产出文件的键序与串行版一致
+        for rel_name, entry in pool.map(_gen, tasks):
+            all_prompts[rel_name] = entry
+
     # 产出数据写入独立文件
     os.makedirs(os.path.dirname(config.PROMPTS_JSON), exist_ok=True)
-    with open(config.PROMPTS_JSON, "w", encoding="utf-8") as f:
-        json.dump(all_prompts, f, ensure_ascii=False, indent=2)
+    _fast_dump(all_prompts, config.PROMPTS_JSON)
     print(f"[Phase2] Prompt 数据已保存: {config.PROMPTS_JSON}")
 
     print(f"\n[Phase2] 共为 {len(all_prompts)} 个页面生成 Prompt。")
@@ -130,8 +192,7 @@ def phase3_history(state: dict):
         "user_histories": user,
     }
     os.makedirs(os.path.dirname(config.HISTORIES_JSON), exist_ok=True)
-    with open(config.HISTORIES_JSON, "w", encoding="utf-8") as f:
-        json.dump(histories, f, ensure_ascii=False, indent=2)
+    _fast_dump(histories, config.HISTORIES_JSON)
     print(f"[Phase3] History 数据已保存: {config.HISTORIES_JSON}")
 
     pipeline_state.mark_completed(state, phase, {
@@ -143,23 +204,136 @@ def phase3_history(state: dict):
 # ============================================================
 # Phase 4 — 渲染模拟
 # ============================================================
-def phase4_render(state: dict):
+# 渲染工作进程的本地模拟器（每个进程一个 WebDriver，初始化一次后复用）
+_worker_sim = None
+# 后台 PNG 写盘线程池：zlib 压缩期间 PIL 释放 GIL，
+# 上一个任务的写盘与下一次浏览器截图重叠执行
+_save_pool = None
+_pending_saves: list = []
+# phase 4 收尾屏障（父进程在 fork 工作进程前创建，子进程继承）
+_flush_barrier = None
+
+
+def _worker_init():
+    """进程池 initializer：构建进程本地的 MonitorSimulator 与写盘线程池。"""
+    global _worker_sim, _save_pool
+    import atexit
+    from concurrent.futures import ThreadPoolExecutor
+
+    import monitor_simulator
+
+    # fork 继承的是父进程的 LogStream——其队列在子进程里没有监听
+    # 线程，所有 print 会被无声吞掉。工作进程直接写回原始流
+    # （仍是同一个终端 fd，只是不进父进程的日志文件）
+    sys.stdout = sys.__stdout__
+    sys.stderr = sys.__stderr__
+
+    _worker_sim = monitor_simulator.MonitorSimulator()
+    atexit.register(_worker_sim.close)
+
+    _save_pool = ThreadPoolExecutor(max_workers=2)
+    # atexit 为 LIFO：先排空写盘，再关 WebDriver
+    atexit.register(_drain_saves_atexit)
+
+
+def _drain_saves() -> list:
+    """等待所有挂起的异步 PNG 写盘完成，返回失败列表 [(path, 错误), ...]。"""
+    global _pending_saves
+    failures = []
+    for path, fut in _pending_saves:
+        try:
+            fut.result()
+        except Exception as e:
+            failures.append((path, str(e)))
+    _pending_saves = []
+    return failures
+
+
+def _drain_saves_atexit():
+    """进程退出兜底排空（正常流程中 _flush_saves 已把队列清空）。"""
+    for path, err in _drain_saves():
+        print(f"[Render] [FAIL] PNG 写盘失败 ({os.path.basename(path)}): {err}")
+
+
+def _flush_saves(_=None) -> list:
+    """
+    进程池收尾任务：排空本工作进程挂起的写盘，把失败带回父进程。
+
+    先在屏障上集合：等齐 max_workers 个进程才放行，阻塞中的进程
+    拿不走第二个收尾任务，保证每个进程恰好排空一次——快进程连抢
+    两个任务、慢进程一个不拿的分发不均不再可能。
+    """
+    if _flush_barrier is not None:
+        try:
+            _flush_barrier.wait(timeout=60)
+        except Exception:
+            # 有进程异常退出时屏障会破，不死等，排空自己的队列要紧
+            pass
+    return _drain_saves()
+
+
+def _render_one(task: tuple) -> tuple:
+    """
+    渲染单个 (HTML × 显示器) 任务（在工作进程中执行）。
+
+    PNG 以 compress_level=1 异步写盘——流水线中间产物无需
+    高压缩比，换 3–5× 的编码速度；写盘与下一次渲染重叠。
+
+    参数:
+        task : (html_path, monitor_cfg, icc_path, raw_path)
+
+    返回:
+        (icc_name, 成功标志, 错误信息, 此前任务的写盘失败列表)
+    """
+    import monitor_simulator
+
+    html_path, monitor_cfg, icc_path, raw_path = task
+    icc_name = os.path.basename(icc_path)
+    # 回收上一个任务的写盘（其压缩已与本次等待/渲染重叠）；
+    # 失败随本次结果带回父进程，由父进程修正统计
+    prev_failures = _drain_saves()
+    try:
+        raw_img, icc_img = _worker_sim.render(html_path, monitor_cfg)
+        _pending_saves.append((icc_path, _save_pool.submit(
+            monitor_simulator._write_png_fast, icc_img, icc_path)))
+        _pending_saves.append((raw_path, _save_pool.submit(
+            monitor_simulator._write_png_fast, raw_img, raw_path)))
+        return (icc_name, True, "", prev_failures)
+    except Exception as e:
+        return (icc_name, False, str(e), prev_failures)
+
+
+def _discard_failed_saves(failures: list, icc_paths: list, raw_paths: list):
+    """把工作进程上报的写盘失败从已收集路径中剔除并打印。"""
+    for path, err in failures:
+        print(f"[Render] [FAIL] PNG 写盘失败 ({os.path.basename(path)}): {err}")
+        if path in icc_paths:
+            icc_paths.remove(path)
+        elif path in raw_paths:
+            raw_paths.remove(path)
+
+
+def phase4_render(state: dict, html_files: list):
     """
     使用 headless 浏览器 + ICC Profile 渲染每个 HTML 页面。
     每个页面 x 每种显示器规格 → 一张 ICC 截图 + 一张原始截图 (U-Net 输入)。
+    (html × monitor) 任务分发到进程池并行渲染，每个工作进程
+    持有自己的 WebDriver，主流程只做任务收集与结果汇总。
     """
+    global _flush_barrier
+
     phase = "phase4_render"
     if pipeline_state.is_completed(state, phase):
         print(f"\n[SKIP] {phase} 已完成，跳过。")
         return
 
-    import monitor_simulator
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
 
     print("\n" + "=" * 60)
     print("Phase 4: 显示器渲染模拟")
     print("=" * 60)
 
-    html_files = webpage_manager.list_html_files()
     if not html_files:
         print("[Phase4] [WARN] 未找到 HTML 文件，跳过。")
         pipeline_state.mark_completed(state, phase, {"count": 0})
@@ -170,40 +344,71 @@ def phase4_render(state: dict):
     screenshot_paths: list[str] = []
     raw_screenshot_paths: list[str] = []
 
-    try:
-        sim = monitor_simulator.MonitorSimulator()
-
-        for html_path in html_files:
-            basename = os.path.splitext(os.path.basename(html_path))[0]
-
-            for monitor_name, monitor_cfg in config.MONITORS.items():
-                icc_name = f"{basename}_{monitor_name}.png"
-                raw_name = f"{basename}_{monitor_name}_raw.png"
-                icc_path = os.path.join(config.SCREENSHOTS_DIR, icc_name)
-                raw_path = os.path.join(config.RAW_SCREENSHOTS_DIR, raw_name)
-
-                # 断点续传：两张图都已存在则跳过
-                icc_exists = os.path.exists(icc_path) and os.path.getsize(icc_path) > 100
-                raw_exists = os.path.exists(raw_path) and os.path.getsize(raw_path) > 100
-                if icc_exists and raw_exists:
-                    print(f"[Render] [SKIP] 已存在: {icc_name}")
-                    screenshot_paths.append(icc_path)
-                    raw_screenshot_paths.append(raw_path)
-                    continue
-
-                try:
-                    raw_img, icc_img = sim.render(html_path, monitor_cfg)
-                    icc_img.save(icc_path, "PNG")
-                    raw_img.save(raw_path, "PNG")
-                    screenshot_paths.append(icc_path)
-                    raw_screenshot_paths.append(raw_path)
-                    print(f"[Render] 已保存: {icc_name} + {raw_name}")
-                except Exception as e:
-                    print(f"[Render] [FAIL] 失败 ({icc_name}): {e}")
-
-        sim.close()
-    except Exception as e:
-        print(f"[Phase4] [FAIL] MonitorSimulator 初始化失败: {e}")
+    # 目录索引替代每个 (html × monitor) 组合的 4 次 exists + getsize
+    # 系统调用（续跑时绝大多数都命中跳过）
+    icc_sizes = _scan_png_dir(config.SCREENSHOTS_DIR)
+    raw_sizes = _scan_png_dir(config.RAW_SCREENSHOTS_DIR)
+
+    # 在父进程完成断点续传检查，只把真正要渲染的任务交给进程池
+    tasks: list[tuple] = []  # (html_path, monitor_cfg, icc_path, raw_path)
+
+    for html_path in html_files:
+        basename = os.path.splitext(os.path.basename(html_path))[0]
+
+        for monitor_name, monitor_cfg in config.MONITORS.items():
+            icc_name = f"{basename}_{monitor_name}.png"
+            raw_name = f"{basename}_{monitor_name}_raw.png"
+            icc_path = os.path.join(config.SCREENSHOTS_DIR, icc_name)
+            raw_path = os.path.join(config.RAW_SCREENSHOTS_DIR, raw_name)
+
+            # 断点续传：两张图都已存在则跳过
+            if icc_sizes.get(icc_name, 0) > 100 and raw_sizes.get(raw_name, 0) > 100:
+                print(f"[Render] [SKIP] 已存在: {icc_name}")
+                screenshot_paths.append(icc_path)
+                raw_screenshot_paths.append(raw_path)
+                continue
+
+            tasks.append((html_path, monitor_cfg, icc_path, raw_path))
+
+    if tasks:
+        # 按窗口尺寸分组派发：连续同尺寸渲染可跳过 set_window_size
+        # 的 CDP 往返（MonitorSimulator 会记住当前尺寸）
+        tasks.sort(key=lambda t: (t[1]["width"], t[1]["height"]))
+
+        max_workers = min(os.cpu_count() or 1, len(config.MONITORS) * 2)
+        print(f"[Phase4] {len(tasks)} 个渲染任务，启动 {max_workers} 个工作进程...")
+
+        # 必须在进程池 fork 之前创建，子进程靠继承拿到同一个屏障
+        _flush_barrier = multiprocessing.Barrier(max_workers)
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_worker_init
+            ) as pool:
+                # chunksize=1：单任务耗时远大于 IPC 开销，细粒度分发更均衡
+                for task, result in zip(tasks, pool.map(_render_one, tasks, chunksize=1)):
+                    _, _, icc_path, raw_path = task
+                    icc_name, ok, err, save_failures = result
+                    _discard_failed_saves(
+                        save_failures, screenshot_paths, raw_screenshot_paths
+                    )
+                    if ok:
+                        screenshot_paths.append(icc_path)
+                        raw_screenshot_paths.append(raw_path)
+                        print(f"[Render] 已保存: {icc_name} + {os.path.basename(raw_path)}")
+                    else:
+                        print(f"[Render] [FAIL] 失败 ({icc_name}): {err}")
+
+                # 渲染全部派发完后，让每个工作进程同步排空尾部挂起的
+                # 写盘——最后一批任务的失败也要在 mark_completed 前修正
+                for save_failures in pool.map(
+                    _flush_saves, range(max_workers), chunksize=1
+                ):
+                    _discard_failed_saves(
+                        save_failures, screenshot_paths, raw_screenshot_paths
+                    )
+        except Exception as e:
+            print(f"[Phase4] [FAIL] 渲染进程池失败: {e}")
 
     print(f"\n[Phase4] 共生成 {len(screenshot_paths)} 张 ICC 截图 + {len(raw_screenshot_paths)} 张原始截图。")
     pipeline_state.mark_completed(state, phase, {
@@ -215,7 +420,7 @@ def phase4_render(state: dict):
 # ============================================================
 # Phase 5 — 元数据汇总
 # ============================================================
-def phase5_metadata(state: dict):
+def phase5_metadata(state: dict, html_files: list):
     """将所有生成结果汇总为一个 JSON 文件。"""
     phase = "phase5_metadata"
     if pipeline_state.is_completed(state, phase):
@@ -226,8 +431,6 @@ def phase5_metadata(state: dict):
     print("Phase 5: 元数据 JSON 汇总")
     print("=" * 60)
 
-    html_files = webpage_manager.list_html_files()
-
     # 从独立的产出文件读取 prompts / histories
     prompts_data: dict = {}
     if os.path.exists(config.PROMPTS_JSON):
@@ -254,7 +457,14 @@ def phase5_metadata(state: dict):
         except (json.JSONDecodeError, IOError):
             pass
 
+    # 目录索引替代每页 × 每显示器的 os.path.exists 逐文件 stat；
+    # Phase 4 无新增截图时直接命中缓存，零重扫
+    icc_names = _scan_png_dir(config.SCREENSHOTS_DIR).keys()
+    raw_names = _scan_png_dir(config.RAW_SCREENSHOTS_DIR).keys()
+
     records: list[dict] = []
+    total_icc = 0   # 构建 record 时同步累计，省去事后两次全表遍历
+    total_raw = 0
 
     for html_path in html_files:
         rel_path = os.path.relpath(html_path, config.RAW_HTML_DIR)
@@ -266,13 +476,11 @@ def phase5_metadata(state: dict):
         raw_screenshots: list[str] = []
         for monitor_name in config.MONITORS:
             png = f"{basename}_{monitor_name}.png"
-            png_path = os.path.join(config.SCREENSHOTS_DIR, png)
-            if os.path.exists(png_path):
+            if png in icc_names:
                 screenshots.append(png)
 
             raw_png = f"{basename}_{monitor_name}_raw.png"
-            raw_path = os.path.join(config.RAW_SCREENSHOTS_DIR, raw_png)
-            if os.path.exists(raw_path):
+            if raw_png in raw_names:
                 raw_screenshots.append(raw_png)
 
         # 该页面的 Prompts
@@ -285,23 +493,26 @@ def phase5_metadata(state: dict):
             "raw_screenshots": raw_screenshots,
             "target_prompts": page_prompts.get("target_prompts", []),
             "user_prompts": page_prompts.get("user_prompts", []),
-            "shadow_histories": history_data.get("shadow_histories", []),
-            "user_histories": history_data.get("user_histories", []),
         }
         records.append(record)
+        total_icc += len(screenshots)
+        total_raw += len(raw_screenshots)
 
+    # 历史与页面无关，只在顶层写一份——此前每条 record 重复全量
+    # 历史，内存与 JSON 体积都随页面数 O(N) 膨胀
     metadata = {
         "total_html_files": len(html_files),
-        "total_screenshots": sum(len(r["screenshots"]) for r in records),
-        "total_raw_screenshots": sum(len(r["raw_screenshots"]) for r in records),
+        "total_screenshots": total_icc,
+        "total_raw_screenshots": total_raw,
         "domains": config.DOMAINS,
         "monitors": list(config.MONITORS.keys()),
+        "shadow_histories": history_data.get("shadow_histories", []),
+        "user_histories": history_data.get("user_histories", []),
         "records": records,
     }
 
     os.makedirs(os.path.dirname(config.OUTPUT_JSON), exist_ok=True)
-    with open(config.OUTPUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    _fast_dump(metadata, config.OUTPUT_JSON)
 
     print(f"[Phase5] 元数据已保存: {config.OUTPUT_JSON}")
     print(f"         HTML 文件: {metadata['total_html_files']}")
@@ -339,10 +550,17 @@ def main():
     # 依次执行 6 个阶段
     phase0_crawl(state)
     phase1_synth(state)
-    phase2_prompts(state)
+
+    # Phase 0/1 之后 HTML 集合不再变化，扫描一次供后续各阶段复用
+    html_files = webpage_manager.list_html_files()
+
+    phase2_prompts(state, html_files)
     phase3_history(state)
-    phase4_render(state)
-    phase5_metadata(state)
+    phase4_render(state, html_files)
+    phase5_metadata(state, html_files)
+
+    # 全部阶段结束后把追加日志压实成快照
+    pipeline_state.checkpoint_state(state)
 
     elapsed = time.time() - start_time
     print("\n" + "=" * 60)
@@ -8,23 +8,60 @@
 #   3. 在 Python 端应用 ICC 色彩配置文件变换，模拟真实显示器色域
 # ============================================================
 
+import functools
+import json
 import os
 import io
 import re
 import shutil
 import stat
-import time
 import zipfile
 import urllib.request
 import subprocess
 import platform as _platform_mod
 
+import math
+
 import numpy as np
 from PIL import Image, ImageCms
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
 
 import config
 
+# Numba JIT（可选）— LUT 三线性插值的原生并行内核，
+# 缺失时回退纯 NumPy 向量化路径
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
+# OpenCV（可选）— libpng 直写的快速 PNG 编码，
+# 缺失或未启用时回退 PIL
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+
+def _write_png_fast(img: Image.Image, path: str):
+    """
+    写出截图 PNG。
+
+    config.USE_CV2_PNG_ENCODER 且 cv2 可用时走 cv2.imwrite
+    （绕过 PIL 的 Python 级 save 分发，直接 C 缓冲写出）；
+    否则用 PIL 低压缩级编码。
+    """
+    if cv2 is not None and config.USE_CV2_PNG_ENCODER:
+        # PIL 为 RGB，cv2 期望 BGR，反转最后一轴
+        arr = np.asarray(img)[:, :, ::-1]
+        if cv2.imwrite(path, arr, [cv2.IMWRITE_PNG_COMPRESSION, 1]):
+            return
+        print(f"[Render] [WARN] cv2 PNG 写出失败，回退 PIL: {os.path.basename(path)}")
+    img.save(path, "PNG", optimize=False, compress_level=1)
+
 # ============================================================
 # 平台检测
 # ============================================================
@@ -33,6 +70,7 @@ _SYSTEM = _platform_mod.system()     # "Windows", "Darwin", "Linux"
 _MACHINE = _platform_mod.machine()   # "x86_64", "AMD64", "arm64", ...
 
 
+@functools.lru_cache(maxsize=None)
 def _driver_platform_tag() -> str:
     """返回 Edge Driver 下载包的平台标识。"""
     if _SYSTEM == "Windows":
@@ -43,6 +81,7 @@ def _driver_platform_tag() -> str:
         return "linux64"
 
 
+@functools.lru_cache(maxsize=None)
 def _driver_exe_name() -> str:
     """返回 Edge Driver 可执行文件名。"""
     return "msedgedriver.exe" if _SYSTEM == "Windows" else "msedgedriver"
@@ -62,8 +101,9 @@ _EDGE_DRIVER_MIRRORS = [
 ]
 
 
+@functools.lru_cache(maxsize=None)
 def _get_edge_version(edge_bin: str) -> str:
-    """从 Edge 可执行文件获取版本号（跨平台）。"""
+    """从 Edge 可执行文件获取版本号（跨平台，结果按路径缓存）。"""
     # Windows：读取文件版本信息
     if _SYSTEM == "Windows":
         try:
@@ -124,6 +164,27 @@ def _ensure_edge_driver(edge_bin: str) -> str:
 
     edge_ver = _get_edge_version(edge_bin)
 
+    # 磁盘哨兵：上次校验/下载成功后写入，命中即跳过
+    # `driver --version` 子进程探测（多 worker 初始化时尤其划算）
+    sentinel_path = os.path.join(_DRIVER_DIR, "driver_ready.json")
+    try:
+        with open(sentinel_path, "r", encoding="utf-8") as f:
+            sentinel = json.load(f)
+        if (sentinel.get("edge_ver") == edge_ver
+                and os.path.isfile(sentinel.get("driver_path", ""))):
+            print(f"[Driver] msedgedriver {edge_ver} 已就绪 (哨兵缓存)")
+            return sentinel["driver_path"]
+    except (OSError, ValueError):
+        pass
+
+    def _write_sentinel(path: str):
+        # 幂等写入，多进程并发重写无害
+        try:
+            with open(sentinel_path, "w", encoding="utf-8") as f:
+                json.dump({"edge_ver": edge_ver, "driver_path": path}, f)
+        except OSError:
+            pass
+
     # 检查已有的 driver 版本是否匹配
     if os.path.isfile(driver_path):
         try:
@@ -134,6 +195,7 @@ def _ensure_edge_driver(edge_bin: str) -> str:
             m = re.search(r"(\d+\.\d+\.\d+\.\d+)", result.stdout)
             if m and m.group(1) == edge_ver:
                 print(f"[Driver] msedgedriver {edge_ver} 已就绪")
+                _write_sentinel(driver_path)
                 return driver_path
             else:
                 print(f"[Driver] 版本不匹配 (driver={m.group(1) if m else '?'}, edge={edge_ver})，重新下载")
@@ -174,6 +236,7 @@ def _ensure_edge_driver(edge_bin: str) -> str:
                 if _SYSTEM != "Windows":
                     os.chmod(found_path, os.stat(found_path).st_mode | stat.S_IEXEC | stat.S_IXGRP | stat.S_IXOTH)
                 print(f"[Driver] msedgedriver {edge_ver} 已安装到 {found_path}")
+                _write_sentinel(found_path)
                 return found_path
 
             raise FileNotFoundError(f"解压后未找到 {driver_exe}")
@@ -237,6 +300,8 @@ def _create_driver():
         from selenium.webdriver.chrome.options import Options as ChromeOptions
         opts = ChromeOptions()
         opts.binary_location = chrome_bin
+        # eager：DOMContentLoaded 即返回，剩余等待交给显式条件
+        opts.page_load_strategy = "eager"
         for arg in _HEADLESS_ARGS:
             opts.add_argument(arg)
         driver = webdriver.Chrome(options=opts)
@@ -275,6 +340,7 @@ def _create_driver():
 
         opts = EdgeOptions()
         opts.binary_location = edge_bin
+        opts.page_load_strategy = "eager"
         for arg in _HEADLESS_ARGS:
             opts.add_argument(arg)
 
@@ -286,6 +352,134 @@ def _create_driver():
     raise RuntimeError("未找到 Chrome 或 Edge 浏览器，请安装其中之一。")
 
 
+# ============================================================
+# ICC 3D LUT（预计算 + 向量化查表）
+# ============================================================
+# 显示器 ICC Profile 只有少数几个，每帧重建 LCMS 变换并逐像素
+# 变换是纯浪费。初始化时对每个 Profile 用一张 33^3 的合成 RGB
+# 网格图跑一次 LCMS，物化为 sRGB→设备 RGB 的查找表；渲染时对
+# 截图做 NumPy 三线性插值查表，整个变换变成 L2 内的内存 gather。
+
+_LUT_SIZE = 33
+
+
+def _build_icc_lut(icc_path: str) -> np.ndarray:
+    """
+    用一次 LCMS 变换物化 sRGB→设备 RGB 的 3D LUT。
+
+    返回:
+        uint8 数组，形状 (_LUT_SIZE, _LUT_SIZE, _LUT_SIZE, 3)，
+        lut[r, g, b] = 变换后的 (R, G, B)
+    """
+    src_profile = ImageCms.createProfile("sRGB")
+    dst_profile = ImageCms.getOpenProfile(icc_path)
+    transform = ImageCms.buildTransformFromOpenProfiles(
+        src_profile, dst_profile, "RGB", "RGB"
+    )
+
+    # 合成 33^3 网格图，一次 applyTransform 得到所有格点的输出
+    levels = np.linspace(0, 255, _LUT_SIZE).round().astype(np.uint8)
+    r, g, b = np.meshgrid(levels, levels, levels, indexing="ij")
+    grid = np.stack([r, g, b], axis=-1).reshape(_LUT_SIZE, _LUT_SIZE * _LUT_SIZE, 3)
+    grid_out = ImageCms.applyTransform(Image.fromarray(grid, "RGB"), transform)
+
+    lut = np.asarray(grid_out, dtype=np.uint8).reshape(
+        _LUT_SIZE, _LUT_SIZE, _LUT_SIZE, 3
+    )
+    # C 连续布局，为后续 JIT/向量化留出最优访存
+    return np.ascontiguousarray(lut)
+
+
+def _trilerp_lut_kernel(arr, lut, out):
+    """
+    逐行并行的三线性插值内核（Numba 编译为原生代码）。
+
+    8 个 LUT 角点的混合融合在单趟循环里完成，不产生任何中间
+    数组；prange 把行切分到所有核心，LLVM 对内层通道循环自动
+    向量化。
+    """
+    h, w = arr.shape[0], arr.shape[1]
+    scale = (lut.shape[0] - 1) / 255.0
+    imax = lut.shape[0] - 2
+
+    for y in prange(h):
+        for x in range(w):
+            cr = arr[y, x, 0] * scale
+            cg = arr[y, x, 1] * scale
+            cb = arr[y, x, 2] * scale
+            r0 = min(int(math.floor(cr)), imax)
+            g0 = min(int(math.floor(cg)), imax)
+            b0 = min(int(math.floor(cb)), imax)
+            fr = cr - r0
+            fg = cg - g0
+            fb = cb - b0
+
+            for ch in range(3):
+                c00 = lut[r0, g0, b0, ch] * (1.0 - fr) + lut[r0 + 1, g0, b0, ch] * fr
+                c10 = lut[r0, g0 + 1, b0, ch] * (1.0 - fr) + lut[r0 + 1, g0 + 1, b0, ch] * fr
+                c01 = lut[r0, g0, b0 + 1, ch] * (1.0 - fr) + lut[r0 + 1, g0, b0 + 1, ch] * fr
+                c11 = lut[r0, g0 + 1, b0 + 1, ch] * (1.0 - fr) + lut[r0 + 1, g0 + 1, b0 + 1, ch] * fr
+                c0 = c00 * (1.0 - fg) + c10 * fg
+                c1 = c01 * (1.0 - fg) + c11 * fg
+                v = c0 * (1.0 - fb) + c1 * fb
+                out[y, x, ch] = min(255, max(0, int(v + 0.5)))
+
+
+if njit is not None:
+    _trilerp_lut_kernel = njit(parallel=True, fastmath=True, cache=True)(
+        _trilerp_lut_kernel
+    )
+
+
+def _apply_lut_trilinear(arr: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """
+    对 uint8 RGB 图像数组做三线性插值 LUT 查表。
+
+    Numba 可用时走 JIT 并行内核，否则走纯 NumPy 向量化路径。
+
+    参数:
+        arr : (H, W, 3) uint8 sRGB 图像
+        lut : _build_icc_lut 产出的 4D 查找表
+
+    返回:
+        (H, W, 3) uint8 变换后图像
+    """
+    if njit is not None:
+        out = np.empty_like(arr)
+        _trilerp_lut_kernel(np.ascontiguousarray(arr), lut, out)
+        return out
+    # 像素值 → LUT 浮点坐标
+    coords = arr.astype(np.float32) * ((_LUT_SIZE - 1) / 255.0)
+    i0 = np.floor(coords).astype(np.int32)
+    np.minimum(i0, _LUT_SIZE - 2, out=i0)  # 上边界格点取前一格插值
+    frac = coords - i0
+
+    r0, g0, b0 = i0[..., 0], i0[..., 1], i0[..., 2]
+    fr = frac[..., 0:1]
+    fg = frac[..., 1:2]
+    fb = frac[..., 2:3]
+
+    # 8 个相邻格点的三线性混合
+    c000 = lut[r0, g0, b0].astype(np.float32)
+    c100 = lut[r0 + 1, g0, b0].astype(np.float32)
+    c010 = lut[r0, g0 + 1, b0].astype(np.float32)
+    c110 = lut[r0 + 1, g0 + 1, b0].astype(np.float32)
+    c001 = lut[r0, g0, b0 + 1].astype(np.float32)
+    c101 = lut[r0 + 1, g0, b0 + 1].astype(np.float32)
+    c011 = lut[r0, g0 + 1, b0 + 1].astype(np.float32)
+    c111 = lut[r0 + 1, g0 + 1, b0 + 1].astype(np.float32)
+
+    c00 = c000 * (1 - fr) + c100 * fr
+    c10 = c010 * (1 - fr) + c110 * fr
+    c01 = c001 * (1 - fr) + c101 * fr
+    c11 = c011 * (1 - fr) + c111 * fr
+    c0 = c00 * (1 - fg) + c10 * fg
+    c1 = c01 * (1 - fg) + c11 * fg
+    out = c0 * (1 - fb) + c1 * fb
+
+    return np.clip(out + 0.5, 0, 255).astype(np.uint8)
+
+
 class MonitorSimulator:
     """
     显示器渲染模拟器。
@@ -294,9 +488,43 @@ class MonitorSimulator:
 
     def __init__(self):
         """
-        初始化 headless 浏览器 WebDriver（自动检测 Chrome / Edge）。
+        初始化 headless 浏览器 WebDriver（自动检测 Chrome / Edge），
+        并为每个显示器的 ICC Profile 预计算 3D LUT。
         """
         self.driver = _create_driver()
+        # 本地 file:// 页面加载不应超过 10s，超时尽早失败
+        self.driver.set_page_load_timeout(10)
+        # 当前窗口尺寸——set_window_size 是整轮 CDP 往返并触发
+        # 重排，连续同尺寸渲染时跳过
+        self._cur_size: tuple = (None, None)
+        # 已加载页面的 file:// URL——同一 HTML 换显示器重渲染时
+        # 跳过整次导航（JS/CSS 重新解析），只改窗口再截图
+        self._last_loaded: str = ""
+
+        # ICC 文件名 → LCMS 变换对象（逐像素回退路径的惰性缓存，
+        # 避免每帧重复解析 Profile / 重建变换图）
+        self._transforms: dict = {}
+
+        # ICC 文件名 → 预计算 LUT；构建失败的 Profile 回退逐像素变换
+        self._luts: dict[str, np.ndarray] = {}
+        for monitor_cfg in config.MONITORS.values():
+            icc_file = monitor_cfg["icc_file"]
+            if icc_file in self._luts:
+                continue
+            icc_path = os.path.join(config.ICC_PROFILE_DIR, icc_file)
+            if not os.path.exists(icc_path):
+                continue
+            try:
+                self._luts[icc_file] = _build_icc_lut(icc_path)
+                print(f"[ICC] LUT 已预计算: {icc_file} ({_LUT_SIZE}^3)")
+            except Exception as e:
+                print(f"[ICC] [WARN] LUT 预计算失败 ({icc_file}): {e}，"
+                      "该 Profile 回退逐像素变换。")
+
+        # 预热 Numba 内核：用 1×1 假图触发编译，JIT 成本不落在 Phase 4 热路径上
+        if njit is not None and self._luts:
+            warm_lut = next(iter(self._luts.values()))
+            _apply_lut_trilinear(np.zeros((1, 1, 3), dtype=np.uint8), warm_lut)
 
     # ----------------------------------------------------------
     # 核心渲染方法
@@ -319,21 +547,34 @@ class MonitorSimulator:
         icc_file = monitor_config["icc_file"]
 
         # ---------- Step 1: 设置窗口大小并加载网页 ----------
-        self.driver.set_window_size(width, height)
+        if (width, height) != self._cur_size:
+            self.driver.set_window_size(width, height)
+            self._cur_size = (width, height)
 
         # 将路径转换为 file:// URI
         abs_path = os.path.abspath(html_path)
         file_url = f"file:///{abs_path.replace(os.sep, '/')}"
-        self.driver.get(file_url)
 
-        # 等待页面加载完成（document.readyState + 短暂延迟让资源渲染）
-        for _ in range(30):
-            ready = self.driver.execute_script("return document.readyState")
-            if ready == "complete":
-                break
-            time.sleep(0.2)
-        # 额外等待确保 CSS / 内联资源渲染完毕
-        time.sleep(0.5)
+        if file_url != self._last_loaded:
+            self.driver.get(file_url)
+            self._last_loaded = file_url
+
+            # eager 策略下 get() 在 DOMContentLoaded 即返回；此处用单个
+            # 显式条件等完整加载 + 字体就绪，取代手写 0.2s 轮询和加载已
+            # 完成时仍固定支付的 0.5s 睡眠
+            try:
+                WebDriverWait(self.driver, 10).until(
+                    lambda d: d.execute_script(
+                        "return document.readyState === 'complete'"
+                        " && (!document.fonts || document.fonts.status === 'loaded')"
+                    )
+                )
+            except TimeoutException:
+                print(f"[Render] [WARN] 页面加载等待超时: {os.path.basename(html_path)}")
+        else:
+            # 同一页面换显示器：免导航，仅强制一次同步重排，
+            # 让新窗口尺寸下的布局在截图前生效
+            self.driver.execute_script("return document.body && document.body.offsetHeight")
 
         print(f"[Render] 已加载: {os.path.basename(html_path)}  窗口: {width}×{height}")
 
@@ -356,9 +597,19 @@ class MonitorSimulator:
             raw_image = Image.open(io.BytesIO(png_data)).convert("RGB")
             print(f"[Render]   Selenium 截图成功 ({raw_image.size[0]}×{raw_image.size[1]})")
 
-        # 如果截图尺寸与目标不匹配（因 DPI 缩放），进行 resize
+        # 尺寸修正：scale-factor=1 + 固定窗口下绝大多数情况已一致。
+        # 捕获图偏大（DPR 取整误差）时 1:1 裁剪即可，不付缩放代价；
+        # 真正需要缩放时默认 BILINEAR，质量敏感场景可开
+        # config.HIGH_QUALITY_RESIZE 换回 LANCZOS
         if raw_image.size != (width, height):
-            raw_image = raw_image.resize((width, height), Image.LANCZOS)
+            cap_w, cap_h = raw_image.size
+            if cap_w >= width and cap_h >= height:
+                raw_image = raw_image.crop((0, 0, width, height))
+            else:
+                resample = (
+                    Image.LANCZOS if config.HIGH_QUALITY_RESIZE else Image.BILINEAR
+                )
+                raw_image = raw_image.resize((width, height), resample)
 
         # ---------- Step 3: ICC 色彩配置文件变换 ----------
         icc_image = self._apply_icc_transform(raw_image, icc_file)
@@ -386,17 +637,32 @@ class MonitorSimulator:
             print(f"[ICC] [WARN] ICC 文件不存在: {icc_path}，跳过色彩变换。")
             return raw_image
 
-        try:
-            # 创建源色彩配置文件（标准 sRGB）
-            src_profile = ImageCms.createProfile("sRGB")
-
-            # 加载目标显示器的 ICC 配置文件
-            dst_profile = ImageCms.getOpenProfile(icc_path)
+        # 快路径：预计算 LUT + 三线性插值查表
+        lut = self._luts.get(icc_filename)
+        if lut is not None:
+            try:
+                arr = np.asarray(raw_image, dtype=np.uint8)
+                out = _apply_lut_trilinear(arr, lut)
+                print(f"[ICC] 色彩变换完成 (LUT): sRGB → {icc_filename}")
+                return Image.fromarray(out, "RGB")
+            except Exception as e:
+                print(f"[ICC] [WARN] LUT 变换失败 ({e})，回退逐像素变换。")
 
-            # 构建从 sRGB → 目标色彩空间的变换对象
-            transform = ImageCms.buildTransformFromOpenProfiles(
-                src_profile, dst_profile, "RGB", "RGB"
-            )
+        try:
+            # 变换对象按 ICC 文件名缓存，只在首帧构建
+            transform = self._transforms.get(icc_filename)
+            if transform is None:
+                # 创建源色彩配置文件（标准 sRGB）
+                src_profile = ImageCms.createProfile("sRGB")
+
+                # 加载目标显示器的 ICC 配置文件
+                dst_profile = ImageCms.getOpenProfile(icc_path)
+
+                # 构建从 sRGB → 目标色彩空间的变换对象
+                transform = ImageCms.buildTransformFromOpenProfiles(
+                    src_profile, dst_profile, "RGB", "RGB"
+                )
+                self._transforms[icc_filename] = transform
 
             # 应用变换
             final_screenshot = ImageCms.applyTransform(raw_image, transform)
@@ -10,6 +10,25 @@ import os
 
 import config
 
+try:
+    import orjson  # Rust 实现，编解码比 stdlib json 快 5-10 倍
+except ImportError:
+    orjson = None
+
+
+def _dumps_bytes(obj) -> bytes:
+    """序列化为 UTF-8 bytes（orjson 优先，缺失回退 stdlib）。"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _loads(data: bytes):
+    """反序列化 bytes（与 _dumps_bytes 对称）。"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 # 所有阶段的名称
 PHASES = [
     "phase0_crawl",       # 真实网页采集
@@ -21,9 +40,29 @@ PHASES = [
 ]
 
 
+def _append_log(record: dict):
+    """向追加日志写入一行 JSON 记录（阶段完成的 O(1) 持久化）。"""
+    os.makedirs(os.path.dirname(config.PIPELINE_STATE_LOG), exist_ok=True)
+    with open(config.PIPELINE_STATE_LOG, "ab") as f:
+        f.write(_dumps_bytes(record) + b"\n")
+        f.flush()
+
+
+def _apply_record(state: dict, record: dict):
+    """把一条日志记录合并进内存状态。"""
+    phase = record.get("phase")
+    if not phase:
+        return
+    if phase not in state["_completed_set"]:
+        state["completed_phases"].append(phase)
+        state["_completed_set"].add(phase)
+    if record.get("data") is not None:
+        state["phase_data"][phase] = record["data"]
+
+
 def load_state() -> dict:
     """
-    加载流水线状态。
+    加载流水线状态：读快照文件，再重放追加日志中快照之后的记录。
 
     返回:
         {
@@ -31,52 +70,112 @@ def load_state() -> dict:
           "phase_data": {<phase_name>: <any serializable data>}
         }
     """
+    state = {"completed_phases": [], "phase_data": {}}
+
     if os.path.exists(config.PIPELINE_STATE_FILE):
         try:
-            with open(config.PIPELINE_STATE_FILE, "r", encoding="utf-8") as f:
-                state = json.load(f)
-                print(f"[State] 已加载断点状态: {config.PIPELINE_STATE_FILE}")
-                completed = state.get("completed_phases", [])
-                if completed:
-                    print(f"[State] 已完成的阶段: {', '.join(completed)}")
-                return state
-        except (json.JSONDecodeError, IOError) as e:
+            with open(config.PIPELINE_STATE_FILE, "rb") as f:
+                state = _loads(f.read())
+            print(f"[State] 已加载断点状态: {config.PIPELINE_STATE_FILE}")
+        except (ValueError, IOError) as e:
             print(f"[State] [WARN] 状态文件损坏，将重新开始: {e}")
+            state = {"completed_phases": [], "phase_data": {}}
 
-    return {"completed_phases": [], "phase_data": {}}
+    # 伴生 set 供 is_completed O(1) 查询（仅内存，序列化前剥离）
+    state["_completed_set"] = set(state.get("completed_phases", []))
+
+    # 重放快照之后追加的记录（尾部半行——写入被打断——静默跳过）
+    if os.path.exists(config.PIPELINE_STATE_LOG):
+        replayed = 0
+        try:
+            with open(config.PIPELINE_STATE_LOG, "rb") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        _apply_record(state, _loads(line))
+                        replayed += 1
+                    except (ValueError, UnicodeDecodeError):
+                        continue
+        except IOError:
+            pass
+        if replayed:
+            print(f"[State] 已重放 {replayed} 条状态日志记录")
+
+    completed = state.get("completed_phases", [])
+    if completed:
+        print(f"[State] 已完成的阶段: {', '.join(completed)}")
+    return state
 
 
 def save_state(state: dict):
-    """将流水线状态保存到磁盘。"""
+    """
+    将流水线状态保存到磁盘（原子写）。
+
+    先写临时文件并 fsync，再 os.replace 到目标路径——任何时刻
+    磁盘上都有一份完整状态，中断不再触发"状态文件损坏"回退。
+    机器写入不再缩进，状态大时省一截序列化开销。
+    """
     os.makedirs(os.path.dirname(config.PIPELINE_STATE_FILE), exist_ok=True)
-    with open(config.PIPELINE_STATE_FILE, "w", encoding="utf-8") as f:
-        json.dump(state, f, ensure_ascii=False, indent=2)
+    # 内存态伴生字段（set 不可 JSON 序列化）不落盘
+    serializable = {k: v for k, v in state.items() if not k.startswith("_")}
+    tmp_path = config.PIPELINE_STATE_FILE + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_dumps_bytes(serializable))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, config.PIPELINE_STATE_FILE)
 
 
 def mark_completed(state: dict, phase_name: str, phase_data=None):
     """
     标记一个阶段为已完成，并持久化。
 
+    只追加一条日志记录（O(1)），不重写全量状态；
+    快照压实由 checkpoint_state 在流水线结束时完成。
+
     参数:
         state      : 当前状态 dict
         phase_name : 阶段名称
         phase_data : 该阶段产生的可序列化数据（可选）
     """
-    if phase_name not in state["completed_phases"]:
+    completed_set = state.setdefault("_completed_set", set(state["completed_phases"]))
+    if phase_name not in completed_set:
         state["completed_phases"].append(phase_name)
+        completed_set.add(phase_name)
     if phase_data is not None:
         state["phase_data"][phase_name] = phase_data
-    save_state(state)
+    _append_log({"phase": phase_name, "data": phase_data})
     print(f"[State] 阶段 {phase_name} 已标记完成并保存")
 
 
+def checkpoint_state(state: dict):
+    """把状态压实为快照并清空追加日志（在阶段边界/收尾调用）。"""
+    save_state(state)
+    try:
+        if os.path.exists(config.PIPELINE_STATE_LOG):
+            os.remove(config.PIPELINE_STATE_LOG)
+    except OSError:
+        pass
+
+
 def is_completed(state: dict, phase_name: str) -> bool:
-    """检查某个阶段是否已完成。"""
-    return phase_name in state.get("completed_phases", [])
+    """检查某个阶段是否已完成（伴生 set，O(1)）。"""
+    completed_set = state.get("_completed_set")
+    if completed_set is None:
+        completed_set = state.setdefault(
+            "_completed_set", set(state.get("completed_phases", []))
+        )
+    return phase_name in completed_set
 
 
 def reset_state():
-    """重置流水线状态（删除状态文件）。"""
-    if os.path.exists(config.PIPELINE_STATE_FILE):
-        os.remove(config.PIPELINE_STATE_FILE)
+    """重置流水线状态（删除快照与追加日志）。"""
+    removed = False
+    for path in (config.PIPELINE_STATE_FILE, config.PIPELINE_STATE_LOG):
+        if os.path.exists(path):
+            os.remove(path)
+            removed = True
+    if removed:
         print("[State] 流水线状态已重置")
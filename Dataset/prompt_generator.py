@@ -7,10 +7,14 @@
 # ============================================================
 
 import os
+import re
 import ast
 import json
+import asyncio
 
 import config
+import llm_cache
+import semantic_cache
 
 # ---------------------- Prompt 模板 ----------------------
 
@@ -32,24 +36,65 @@ PARAPHRASE_PROMPT_TEMPLATE = (
     "{target_prompt}"
 )
 
+# Prompt 模板 2b: 批量改写 — N 条 Target Prompt 合并为一次调用，
+# 把 N 个串行 HTTP 往返压缩成 1 个
+PARAPHRASE_BATCH_TEMPLATE = (
+    "Rephrase each of the following queries into a semantically equivalent "
+    "version. Return a Python list of {n} strings in the same order, "
+    "without any other content.\n{numbered_queries}"
+)
+
 
 # ============================================================
 # OpenAI API 调用封装
 # ============================================================
+_TEMPERATURE = 0.7
+
+# 模块级客户端单例——复用 httpx 连接池与 TLS 会话，
+# 避免每次调用重建客户端（线程池并发下 OpenAI 客户端线程安全）
+_client = None
+
+
+def _get_client():
+    """惰性构建并复用 OpenAI 客户端。"""
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(api_key=config.OPENAI_API_KEY)
+    return _client
+
+
+_async_client = None
+
+
+def _get_async_client():
+    """惰性构建并复用异步 OpenAI 客户端（批量并发调用用）。"""
+    global _async_client
+    if _async_client is None:
+        from openai import AsyncOpenAI
+        _async_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
+    return _async_client
+
+
 def _call_openai(prompt: str) -> str:
     """
-    调用 OpenAI Chat Completion API。
+    调用 OpenAI Chat Completion API（结果经内容寻址磁盘缓存）。
     """
-    try:
-        from openai import OpenAI
+    cached = llm_cache.get(config.OPENAI_MODEL, _TEMPERATURE, prompt)
+    if cached is not None:
+        return cached
 
-        client = OpenAI(api_key=config.OPENAI_API_KEY)
+    try:
+        client = _get_client()
         response = client.chat.completions.create(
             model=config.OPENAI_MODEL,
             messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
+            temperature=_TEMPERATURE,
         )
-        return response.choices[0].message.content.strip()
+        result = response.choices[0].message.content.strip()
+        if result:
+            llm_cache.put(config.OPENAI_MODEL, _TEMPERATURE, prompt, result)
+        return result
     except Exception as e:
         print(f"[PromptGenerator] OpenAI API 调用失败: {e}")
         return ""
@@ -78,28 +123,90 @@ def _mock_target_prompts(html_path: str) -> list:
     ]
 
 
+# 前缀替换表 + 一次性编译的交替正则——单次匹配取代逐项 startswith 扫描
+_PARAPHRASE_MAP = {
+    "Click on": "Please tap on",
+    "Scroll down to": "Kindly scroll towards",
+    "Type": "Enter",
+    "Navigate to": "Go to",
+    "Double-click on": "Perform a double-click on",
+    "Right-click on": "Do a right-click on",
+    "Scroll up to": "Scroll back up to",
+}
+# 长前缀在前，避免 "Scroll down to" 被 "Type" 之类短前缀截胡
+_PARAPHRASE_RE = re.compile(
+    "^(" + "|".join(
+        re.escape(k) for k in sorted(_PARAPHRASE_MAP, key=len, reverse=True)
+    ) + r")\b"
+)
+
+
 def _mock_paraphrase(target_prompt: str) -> str:
     """
     Mock 模式下对 Target Prompt 进行简单改写。
     """
-    # 简单的前缀替换模拟改写
-    replacements = {
-        "Click on": "Please tap on",
-        "Scroll down to": "Kindly scroll towards",
-        "Type": "Enter",
-        "Navigate to": "Go to",
-        "Double-click on": "Perform a double-click on",
-        "Right-click on": "Do a right-click on",
-        "Scroll up to": "Scroll back up to",
-    }
-    result = target_prompt
-    for old, new in replacements.items():
-        if result.startswith(old):
-            result = result.replace(old, new, 1)
-            break
-    else:
-        result = "Could you " + result[0].lower() + result[1:]
-    return result
+    m = _PARAPHRASE_RE.match(target_prompt)
+    if m:
+        return _PARAPHRASE_MAP[m.group(1)] + target_prompt[m.end():]
+    return "Could you " + target_prompt[0].lower() + target_prompt[1:]
+
+
+def _extract_list(response: str):
+    """
+    从 LLM 返回中提取 Python/JSON 列表。
+
+    先剥掉 markdown 代码围栏，定位首个 `[...]` 片段后优先走
+    json.loads（C 实现，快且不构建 AST），失败再回退
+    ast.literal_eval 兼容单引号等非严格 JSON 写法。
+    解析不出列表返回 None。
+    """
+    if not response:
+        return None
+
+    text = response.strip()
+    if text.startswith("```"):
+        text = re.sub(r"^```[a-zA-Z]*\n?|```$", "", text).strip()
+
+    m = re.search(r"\[.*\]", text, re.S)
+    if not m:
+        return None
+    snippet = m.group(0)
+
+    try:
+        parsed = json.loads(snippet)
+        if isinstance(parsed, list):
+            return parsed
+    except ValueError:
+        pass
+
+    try:
+        parsed = ast.literal_eval(snippet)
+        if isinstance(parsed, list):
+            return parsed
+    except (ValueError, SyntaxError):
+        pass
+    return None
+
+
+def _parse_batch_paraphrase(response: str, n: int):
+    """
+    解析批量改写的返回：优先按 Python 列表解析，退而按编号行拆分。
+    条数不符或解析失败返回 None（调用方整批回退）。
+    """
+    if not response:
+        return None
+
+    parsed = _extract_list(response)
+    if parsed is not None and len(parsed) == n:
+        return [str(p) for p in parsed]
+
+    lines = [
+        line.strip().lstrip("0123456789.-) ")
+        for line in response.split("\n") if line.strip()
+    ]
+    if len(lines) == n:
+        return lines
+    return None
 
 
 # ============================================================
@@ -124,33 +231,91 @@ def generate_target_prompts(html_path: str, use_mock: bool = None) -> list:
         print(f"[PromptGen] Mock Target Prompts 生成完毕: {os.path.basename(html_path)}")
         return prompts
 
-    # 真实模式：读取 HTML 源码并调用 API
-    with open(html_path, "r", encoding="utf-8") as f:
-        html_source = f.read()
-
-    # 为避免 token 超限，截断至前 4000 字符
-    html_source_truncated = html_source[:4000]
-    prompt = TARGET_PROMPT_TEMPLATE.format(html_source=html_source_truncated)
+    # 真实模式：只读取文件开头（避免 token 超限），不把多 MB 页面整页载入内存
+    prompt = _build_target_prompt(html_path)
     response = _call_openai(prompt)
+    return _parse_target_response(response, html_path)
+
+
+def _build_target_prompt(html_path: str) -> str:
+    """读取页面开头 4096 字符并填入 Target Prompt 模板。"""
+    with open(html_path, "r", encoding="utf-8", errors="ignore") as f:
+        html_source_truncated = f.read(4096)
+    return TARGET_PROMPT_TEMPLATE.format(html_source=html_source_truncated)
 
+
+def _parse_target_response(response: str, html_path: str) -> list:
+    """解析 Target Prompt 的 LLM 返回；失败逐级回退（按行拆分 → Mock）。"""
     if not response:
         print(f"[PromptGen] API 失败，回退 Mock: {os.path.basename(html_path)}")
         return _mock_target_prompts(html_path)
 
-    # 尝试解析 LLM 返回的 Python 列表
-    try:
-        prompts = ast.literal_eval(response)
-        if isinstance(prompts, list):
-            print(f"[PromptGen] API Target Prompts 生成成功: {os.path.basename(html_path)}")
-            return [str(p) for p in prompts]
-    except (ValueError, SyntaxError):
-        pass
+    # 尝试解析 LLM 返回的列表（json 快路径 + ast 兜底）
+    prompts = _extract_list(response)
+    if prompts is not None:
+        print(f"[PromptGen] API Target Prompts 生成成功: {os.path.basename(html_path)}")
+        return [str(p) for p in prompts]
 
     # 解析失败时按行拆分
     prompts = [line.strip().lstrip("0123456789.-) ") for line in response.split("\n") if line.strip()]
     return prompts[:10] if prompts else _mock_target_prompts(html_path)
 
 
+async def _async_call_openai(prompt: str, sem: "asyncio.Semaphore") -> str:
+    """_call_openai 的异步版本——共用同一套内容寻址磁盘缓存。"""
+    cached = llm_cache.get(config.OPENAI_MODEL, _TEMPERATURE, prompt)
+    if cached is not None:
+        return cached
+
+    try:
+        client = _get_async_client()
+        async with sem:
+            response = await client.chat.completions.create(
+                model=config.OPENAI_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=_TEMPERATURE,
+            )
+        result = response.choices[0].message.content.strip()
+        if result:
+            llm_cache.put(config.OPENAI_MODEL, _TEMPERATURE, prompt, result)
+        return result
+    except Exception as e:
+        print(f"[PromptGenerator] OpenAI API 调用失败: {e}")
+        return ""
+
+
+def generate_target_prompts_batch(
+    html_paths: list, use_mock: bool = None, concurrency: int = 16
+) -> list:
+    """
+    generate_target_prompts 的批量并发版本。
+
+    用 AsyncOpenAI + Semaphore 把所有页面的请求放进一个事件循环，
+    网络往返相互重叠；返回与 html_paths 一一对应的 prompts 列表。
+
+    参数:
+        html_paths  : HTML 文件路径列表
+        use_mock    : 是否使用 Mock 模式
+        concurrency : 最大并发请求数
+    """
+    if use_mock is None:
+        use_mock = config.USE_MOCK
+
+    if use_mock or not html_paths:
+        return [_mock_target_prompts(p) for p in html_paths]
+
+    async def _one(html_path: str, sem) -> list:
+        prompt = _build_target_prompt(html_path)
+        response = await _async_call_openai(prompt, sem)
+        return _parse_target_response(response, html_path)
+
+    async def _run() -> list:
+        sem = asyncio.Semaphore(concurrency)
+        return list(await asyncio.gather(*[_one(p, sem) for p in html_paths]))
+
+    return asyncio.run(_run())
+
+
 def generate_user_prompts(target_prompts: list, use_mock: bool = None) -> list:
     """
     对 Target Prompts 进行语义等价改写，生成 User Prompts。
@@ -165,17 +330,34 @@ def generate_user_prompts(target_prompts: list, use_mock: bool = None) -> list:
     if use_mock is None:
         use_mock = config.USE_MOCK
 
-    user_prompts = []
-    for tp in target_prompts:
-        if use_mock:
-            user_prompts.append(_mock_paraphrase(tp))
-        else:
-            prompt = PARAPHRASE_PROMPT_TEMPLATE.format(target_prompt=tp)
-            response = _call_openai(prompt)
-            if response:
-                user_prompts.append(response)
+    if use_mock or not target_prompts:
+        user_prompts = [_mock_paraphrase(tp) for tp in target_prompts]
+    else:
+        # 先查语义缓存——模板化 Target Prompt 之间高度相似，
+        # 余弦命中的条目直接复用改写结果，不进 API 批次
+        sem_hits = semantic_cache.lookup_batch(target_prompts)
+        user_prompts = list(sem_hits)
+        miss_idx = [i for i, hit in enumerate(sem_hits) if hit is None]
+        n_hit = len(target_prompts) - len(miss_idx)
+        if n_hit:
+            print(f"[PromptGen] 语义缓存命中 {n_hit}/{len(target_prompts)} 条")
+
+        if miss_idx:
+            # 未命中部分单次批量调用改写（网络往返从 N 次降到 1 次）
+            misses = [target_prompts[i] for i in miss_idx]
+            numbered = "\n".join(f"{i + 1}. {tp}" for i, tp in enumerate(misses))
+            prompt = PARAPHRASE_BATCH_TEMPLATE.format(
+                n=len(misses), numbered_queries=numbered
+            )
+            paraphrased = _parse_batch_paraphrase(_call_openai(prompt), len(misses))
+            if paraphrased is None:
+                # 整批失败才回退逐条 Mock 改写
+                print("[PromptGen] 批量改写失败，回退 Mock。")
+                paraphrased = [_mock_paraphrase(tp) for tp in misses]
             else:
-                user_prompts.append(_mock_paraphrase(tp))
+                semantic_cache.add_batch(misses, paraphrased)
+            for i, up in zip(miss_idx, paraphrased):
+                user_prompts[i] = up
 
     mode = "Mock" if use_mock else "API"
     print(f"[PromptGen] {mode} User Prompts 生成完毕，共 {len(user_prompts)} 条。")
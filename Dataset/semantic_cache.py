@@ -0,0 +1,141 @@
+# ============================================================
+# semantic_cache.py — 改写调用的语义相似缓存
+# ============================================================
+# llm_cache 只能命中逐字节相同的 prompt；而改写请求大量来自
+# 只差一个文件名的模板化 Target Prompt。这里用句向量做近似
+# 命中：余弦相似度超过阈值即复用已存的改写结果，省掉 OpenAI
+# 调用。索引规模只有几千条，直接 NumPy 精确暴力检索即可，
+# 无需引入 FAISS。
+#
+# 依赖 sentence-transformers（可选）——缺失时本模块整体降级为
+# 透明 no-op，调用方行为不变。
+#
+# 持久化布局: {SEMANTIC_CACHE_DIR}/embeddings.npy + responses.json
+# ============================================================
+
+import json
+import os
+import threading
+from typing import List, Optional
+
+import config
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 句向量模型惰性加载（首次调用才付模型加载成本）
+_model = None
+_model_failed = False
+
+# 内存索引：归一化句向量矩阵 (N, D) 与并行的改写结果列表。
+# phase 2 在线程池里并发调用本模块，_embeddings 重绑定与
+# _responses.extend 必须在同一把锁下完成，否则两者会永久错位
+_embeddings = None
+_responses: List[str] = []
+_loaded = False
+_lock = threading.Lock()
+
+
+def _get_model():
+    """惰性加载 SentenceTransformer；不可用时返回 None（只告警一次）。"""
+    global _model, _model_failed
+    if _model is not None or _model_failed:
+        return _model
+    try:
+        from sentence_transformers import SentenceTransformer
+        _model = SentenceTransformer("all-MiniLM-L6-v2")
+    except Exception as e:
+        print(f"[SemCache] [WARN] 句向量模型不可用，语义缓存关闭: {e}")
+        _model_failed = True
+    return _model
+
+
+def available() -> bool:
+    """语义缓存是否可用（依赖齐全且模型加载成功）。"""
+    return np is not None and _get_model() is not None
+
+
+def _emb_path() -> str:
+    return os.path.join(config.SEMANTIC_CACHE_DIR, "embeddings.npy")
+
+
+def _resp_path() -> str:
+    return os.path.join(config.SEMANTIC_CACHE_DIR, "responses.json")
+
+
+def _load():
+    """从磁盘恢复索引（仅首次使用时执行一次；调用方需持有 _lock）。"""
+    global _embeddings, _responses, _loaded
+    if _loaded:
+        return
+    _loaded = True
+    try:
+        emb = np.load(_emb_path())
+        with open(_resp_path(), "r", encoding="utf-8") as f:
+            responses = json.load(f)
+        if len(responses) == emb.shape[0]:
+            _embeddings = emb
+            _responses = responses
+            print(f"[SemCache] 已加载语义缓存，共 {len(responses)} 条")
+    except (OSError, ValueError):
+        pass
+
+
+def _save():
+    """把索引写回磁盘（失败时静默忽略，下次运行重建；调用方需持有 _lock）。"""
+    try:
+        os.makedirs(config.SEMANTIC_CACHE_DIR, exist_ok=True)
+        np.save(_emb_path(), _embeddings)
+        with open(_resp_path(), "w", encoding="utf-8") as f:
+            json.dump(_responses, f, ensure_ascii=False)
+    except OSError:
+        pass
+
+
+def _encode(texts: List[str]):
+    """批量编码并 L2 归一化（归一化后点积即余弦相似度）。"""
+    vecs = _get_model().encode(texts, convert_to_numpy=True)
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    return (vecs / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def lookup_batch(texts: List[str]) -> List[Optional[str]]:
+    """
+    批量查询：每条文本返回命中的改写结果，未命中为 None。
+    不可用时返回全 None（调用方无感知降级）。
+    """
+    if not available():
+        return [None] * len(texts)
+    with _lock:
+        _load()
+        if _embeddings is None or not len(_responses):
+            return [None] * len(texts)
+
+        queries = _encode(texts)
+        sims = queries @ _embeddings.T       # (len(texts), N)
+        best = sims.argmax(axis=1)
+        results: List[Optional[str]] = []
+        for row, idx in enumerate(best):
+            if sims[row, idx] >= config.SEMANTIC_CACHE_THRESHOLD:
+                results.append(_responses[idx])
+            else:
+                results.append(None)
+        return results
+
+
+def add_batch(texts: List[str], responses: List[str]):
+    """把新的 (文本, 改写) 对加入索引并持久化。"""
+    global _embeddings
+    if not available() or not texts:
+        return
+    with _lock:
+        _load()
+        vecs = _encode(texts)
+        if _embeddings is None:
+            _embeddings = vecs
+        else:
+            _embeddings = np.concatenate([_embeddings, vecs], axis=0)
+        _responses.extend(responses)
+        _save()
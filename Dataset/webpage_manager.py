@@ -8,10 +8,11 @@
 # ============================================================
 
 import os
-import glob
+import string
 from typing import Optional
 
 import config
+import llm_cache
 
 # ---------------------- 论文原文 Prompt ----------------------
 SYNTHETIC_PROMPT = (
@@ -29,16 +30,33 @@ SYNTHETIC_PROMPT = (
 # ============================================================
 # OpenAI API 调用
 # ============================================================
-def _call_openai(prompt: str) -> str:
-    """调用 OpenAI Chat Completion API 生成 HTML。"""
-    try:
+_TEMPERATURE = 0.7
+
+# 模块级客户端单例——复用 httpx 连接池与 TLS 会话
+_client = None
+
+
+def _get_client():
+    """惰性构建并复用 OpenAI 客户端。"""
+    global _client
+    if _client is None:
         from openai import OpenAI
+        _client = OpenAI(api_key=config.OPENAI_API_KEY)
+    return _client
+
 
-        client = OpenAI(api_key=config.OPENAI_API_KEY)
+def _call_openai(prompt: str) -> str:
+    """调用 OpenAI Chat Completion API 生成 HTML（结果经磁盘缓存）。"""
+    cached = llm_cache.get(config.OPENAI_MODEL, _TEMPERATURE, prompt)
+    if cached is not None:
+        return cached
+
+    try:
+        client = _get_client()
         response = client.chat.completions.create(
             model=config.OPENAI_MODEL,
             messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
+            temperature=_TEMPERATURE,
             max_tokens=4096,
         )
         raw = response.choices[0].message.content
@@ -51,6 +69,9 @@ def _call_openai(prompt: str) -> str:
         if content.endswith("```"):
             content = content[:-3].strip()
 
+        # 缓存清洗后的最终内容
+        if content:
+            llm_cache.put(config.OPENAI_MODEL, _TEMPERATURE, prompt, content)
         return content
 
     except ImportError:
@@ -64,36 +85,34 @@ def _call_openai(prompt: str) -> str:
 # ============================================================
 # Mock HTML 生成（含 CSS Grid / Flexbox）
 # ============================================================
-def _generate_mock_html(category: str, index: int) -> str:
-    """生成一个含 CSS Grid 布局的 Mock HTML 页面。"""
-    color_themes = {
-        "Blog": ("#1a1a2e", "#16213e", "#0f3460", "#e94560"),
-        "Commerce": ("#2d3436", "#636e72", "#00b894", "#fdcb6e"),
-        "Education": ("#2c3e50", "#3498db", "#2ecc71", "#e74c3c"),
-        "Healthcare": ("#00b4d8", "#0077b6", "#90e0ef", "#caf0f8"),
-        "Portfolio": ("#0d1b2a", "#1b263b", "#415a77", "#e0e1dd"),
-    }
-
-    bg, secondary, accent, highlight = color_themes.get(
-        category, ("#333", "#555", "#007bff", "#ffc107")
-    )
-
-    return f"""<!DOCTYPE html>
+# 各类别配色: (bg, secondary, accent, highlight)
+_COLOR_THEMES = {
+    "Blog": ("#1a1a2e", "#16213e", "#0f3460", "#e94560"),
+    "Commerce": ("#2d3436", "#636e72", "#00b894", "#fdcb6e"),
+    "Education": ("#2c3e50", "#3498db", "#2ecc71", "#e74c3c"),
+    "Healthcare": ("#00b4d8", "#0077b6", "#90e0ef", "#caf0f8"),
+    "Portfolio": ("#0d1b2a", "#1b263b", "#415a77", "#e0e1dd"),
+}
+_DEFAULT_THEME = ("#333", "#555", "#007bff", "#ffc107")
+
+# 页面骨架在模块导入时编译一次（string.Template 无需转义 CSS 花括号），
+# 每次生成只做一遍占位符替换，而不是重跑整个 4KB f-string 的格式化
+_MOCK_TEMPLATE = string.Template("""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Mock {category} Page {index + 1}</title>
+    <title>Mock ${category} Page ${page_no}</title>
     <style>
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body {
             font-family: 'Segoe UI', system-ui, -apple-system, sans-serif;
             background-color: #f8f9fa;
             color: #333;
             line-height: 1.6;
-        }}
-        header {{
-            background: {bg};
+        }
+        header {
+            background: ${bg};
             color: #fff;
             padding: 1rem 2rem;
             display: flex;
@@ -102,91 +121,91 @@ def _generate_mock_html(category: str, index: int) -> str:
             position: sticky;
             top: 0;
             z-index: 100;
-        }}
-        header h1 {{ font-size: 1.4rem; letter-spacing: 1px; }}
-        nav {{ display: flex; gap: 1.5rem; }}
-        nav a {{
+        }
+        header h1 { font-size: 1.4rem; letter-spacing: 1px; }
+        nav { display: flex; gap: 1.5rem; }
+        nav a {
             color: rgba(255,255,255,0.85);
             text-decoration: none;
             font-weight: 500;
             transition: color 0.2s;
-        }}
-        nav a:hover {{ color: {highlight}; }}
-        .hero {{
-            background: linear-gradient(135deg, {bg}, {secondary});
+        }
+        nav a:hover { color: ${highlight}; }
+        .hero {
+            background: linear-gradient(135deg, ${bg}, ${secondary});
             color: #fff;
             text-align: center;
             padding: 5rem 2rem;
-        }}
-        .hero h2 {{ font-size: 2.5rem; margin-bottom: 1rem; }}
-        .hero p {{ font-size: 1.1rem; max-width: 600px; margin: 0 auto 2rem; opacity: 0.9; }}
-        .hero .btn {{
+        }
+        .hero h2 { font-size: 2.5rem; margin-bottom: 1rem; }
+        .hero p { font-size: 1.1rem; max-width: 600px; margin: 0 auto 2rem; opacity: 0.9; }
+        .hero .btn {
             display: inline-block;
             padding: 0.8rem 2rem;
-            background: {highlight};
-            color: {bg};
+            background: ${highlight};
+            color: ${bg};
             border-radius: 30px;
             text-decoration: none;
             font-weight: 600;
             transition: transform 0.2s;
-        }}
-        .hero .btn:hover {{ transform: translateY(-2px); }}
-        .grid-section {{
+        }
+        .hero .btn:hover { transform: translateY(-2px); }
+        .grid-section {
             max-width: 1200px;
             margin: 3rem auto;
             padding: 0 2rem;
-        }}
-        .grid-section h3 {{
+        }
+        .grid-section h3 {
             font-size: 1.8rem;
             margin-bottom: 1.5rem;
-            color: {bg};
-        }}
-        .card-grid {{
+            color: ${bg};
+        }
+        .card-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
             gap: 1.5rem;
-        }}
-        .card {{
+        }
+        .card {
             background: #fff;
             border-radius: 12px;
             overflow: hidden;
             box-shadow: 0 2px 15px rgba(0,0,0,0.08);
             transition: transform 0.2s, box-shadow 0.2s;
-        }}
-        .card:hover {{
+        }
+        .card:hover {
             transform: translateY(-4px);
             box-shadow: 0 8px 25px rgba(0,0,0,0.12);
-        }}
-        .card-img {{
+        }
+        .card-img {
             width: 100%;
             height: 180px;
-            background: linear-gradient(45deg, {accent}, {secondary});
+            background: linear-gradient(45deg, ${accent}, ${secondary});
             display: flex;
             align-items: center;
             justify-content: center;
             color: #fff;
             font-size: 1.2rem;
             font-weight: 600;
-        }}
-        .card-body {{ padding: 1.2rem; }}
-        .card-body h4 {{ margin-bottom: 0.5rem; color: {bg}; }}
-        .card-body p {{ font-size: 0.9rem; color: #666; }}
-        .features {{
+        }
+        .card-body { padding: 1.2rem; }
+        .card-body h4 { margin-bottom: 0.5rem; color: ${bg}; }
+        .card-body p { font-size: 0.9rem; color: #666; }
+        .features {
             display: flex;
             flex-wrap: wrap;
             gap: 2rem;
             max-width: 1200px;
             margin: 3rem auto;
             padding: 0 2rem;
-        }}
-        .feature {{
+        }
+        .feature {
             flex: 1 1 250px;
             text-align: center;
             padding: 2rem;
-        }}
-        .feature .icon {{
+        }
+        .feature .icon {
             width: 60px; height: 60px;
-            background: {accent};
+            background: ${accent};
             border-radius: 50%;
             margin: 0 auto 1rem;
             display: flex;
@@ -194,24 +213,24 @@ def _generate_mock_html(category: str, index: int) -> str:
             justify-content: center;
             color: #fff;
             font-size: 1.5rem;
-        }}
-        footer {{
-            background: {bg};
+        }
+        footer {
+            background: ${bg};
             color: rgba(255,255,255,0.7);
             text-align: center;
             padding: 2rem;
             margin-top: 3rem;
-        }}
-        @media (max-width: 768px) {{
-            header {{ flex-direction: column; gap: 0.5rem; }}
-            .hero h2 {{ font-size: 1.8rem; }}
-            .features {{ flex-direction: column; }}
-        }}
+        }
+        @media (max-width: 768px) {
+            header { flex-direction: column; gap: 0.5rem; }
+            .hero h2 { font-size: 1.8rem; }
+            .features { flex-direction: column; }
+        }
     </style>
 </head>
 <body>
     <header>
-        <h1>{category} Hub</h1>
+        <h1>${category} Hub</h1>
         <nav>
             <a href="#">Home</a>
             <a href="#">About</a>
@@ -221,7 +240,7 @@ def _generate_mock_html(category: str, index: int) -> str:
         </nav>
     </header>
     <section class="hero">
-        <h2>Welcome to {category} Page {index + 1}</h2>
+        <h2>Welcome to ${category} Page ${page_no}</h2>
         <p>This is a synthetically generated mock page for the WebInject dataset.
            Built with modern CSS Grid and Flexbox layouts for a professional look.</p>
         <a href="#" class="btn">Explore Now</a>
@@ -273,10 +292,23 @@ def _generate_mock_html(category: str, index: int) -> str:
         </div>
     </section>
     <footer>
-        <p>&copy; 2026 {category} Mock Page {index + 1} — WebInject Dataset Pipeline</p>
+        <p>&copy; 2026 ${category} Mock Page ${page_no} — WebInject Dataset Pipeline</p>
     </footer>
 </body>
-</html>"""
+</html>""")
+
+
+def _generate_mock_html(category: str, index: int) -> str:
+    """生成一个含 CSS Grid 布局的 Mock HTML 页面。"""
+    bg, secondary, accent, highlight = _COLOR_THEMES.get(category, _DEFAULT_THEME)
+    return _MOCK_TEMPLATE.substitute(
+        category=category,
+        page_no=index + 1,
+        bg=bg,
+        secondary=secondary,
+        accent=accent,
+        highlight=highlight,
+    )
 
 
 # ============================================================
@@ -330,23 +362,29 @@ def generate_all() -> list:
     批量生成所有类别的合成网页。
     返回所有生成/已存在文件的路径列表。
     """
+    from concurrent.futures import ThreadPoolExecutor
+
     print("\n" + "=" * 60)
     print("Phase 1: 合成网页生成 (Synthetic Webpage Generation)")
     print("=" * 60)
 
     all_paths: list[str] = []
-    stats: dict[str, int] = {}
-
-    for category in config.DOMAINS:
-        print(f"\n--- 类别: {category} ---")
-        cat_paths: list[str] = []
-
-        for idx in range(config.NUM_SYNTH_PAGES):
-            path = generate_one(category, idx)
-            cat_paths.append(path)
-
-        stats[category] = len(cat_paths)
-        all_paths.extend(cat_paths)
+    stats: dict[str, int] = {cat: 0 for cat in config.DOMAINS}
+
+    # 生成以 OpenAI HTTP / 文件写为主，线程池并发发起全部
+    # (类别 × 序号) 任务；generate_one 内部的断点续传检查让已
+    # 存在的页面在 worker 里直接短路，不发 API 请求
+    tasks = [
+        (category, idx)
+        for category in config.DOMAINS
+        for idx in range(config.NUM_SYNTH_PAGES)
+    ]
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        for (category, _), path in zip(
+            tasks, pool.map(lambda args: generate_one(*args), tasks)
+        ):
+            stats[category] += 1
+            all_paths.append(path)
 
     print("\n" + "=" * 60)
     print("合成生成汇总")
@@ -370,10 +408,18 @@ def list_html_files() -> list:
     html_files: list[str] = []
     for category in config.DOMAINS:
         cat_dir = os.path.join(config.RAW_HTML_DIR, category)
-        if not os.path.isdir(cat_dir):
+        try:
+            # scandir 复用目录项的 d_type，避免 glob 的逐项 stat 与模式编译
+            with os.scandir(cat_dir) as it:
+                files = [
+                    e.path
+                    for e in it
+                    if e.name.endswith(".html") and e.is_file(follow_symlinks=False)
+                ]
+        except OSError:
             continue
-        for f in sorted(glob.glob(os.path.join(cat_dir, "*.html"))):
-            html_files.append(f)
+        files.sort()
+        html_files.extend(files)
     return html_files
 
 
@@ -26,8 +26,15 @@ TRAIN_CONFIG = {
     "CHECKPOINT_DIR": os.path.join(BASE_DIR, "checkpoints"),
     "LMDB_DIR": os.path.join(BASE_DIR, "data"),  # 每个 monitor 一个 LMDB
     "CROP_SIZE": 512,             # 4K 截图随机裁剪尺寸
-    "NUM_WORKERS": 4,             # DataLoader worker 数
+    "NUM_WORKERS": min(os.cpu_count() or 1, 8),  # DataLoader worker 数
+    "PREFETCH_FACTOR": 4,         # 每 worker 预取 batch 数（解码与计算重叠）
     "PIN_MEMORY": True,
+    "USE_AMP": True,              # 混合精度训练 (bf16 优先，否则 fp16+GradScaler)
+    "USE_CHECKPOINT": True,       # 瓶颈块激活重计算（省显存换计算）
+    "USE_COMPILE": True,          # torch.compile (reduce-overhead)，仅 CUDA 生效
+    "USE_CUDA_GRAPH": True,       # 手动 CUDA Graph 捕获训练步（USE_COMPILE 关闭时生效）
+    "CONCURRENT_MONITORS": True,  # 单 GPU 上多 Monitor 各走一条 CUDA stream 轮转训练
+    "LOSS": "smooth_l1",          # "smooth_l1" (β=0.01, 抗离群像素) 或 "mse"
 }
 
 # ======================= 目标显示器规格 ====================
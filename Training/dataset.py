@@ -8,19 +8,114 @@
 #   - 标准 ToTensor 归一化
 # ============================================================
 
+import atexit
 import io
+import os
 import pickle
 import random
+import struct
 
 import lmdb
 import numpy as np
 import torch
 from PIL import Image
 from torch.utils.data import Dataset
-from torchvision import transforms
 
 from config import TRAIN_CONFIG
 
+try:
+    import cv2  # libpng C 路径解码，比 PIL 快约 2-3 倍
+except ImportError:
+    cv2 = None
+
+try:
+    import zstandard  # 原始像素载荷的解压（见 pack_data._read_image_payload）
+except ImportError:
+    zstandard = None
+
+_PNG_SIG = b"\x89PNG\r\n\x1a\n"
+_zstd_d = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+
+def _decode_image(buf: bytes) -> Image.Image:
+    """
+    解码 LMDB 值 → RGB PIL Image。
+
+    新格式（pack_data 原始像素载荷）只做 frombuffer + reshape，
+    热路径零 PNG inflate；旧格式 PNG bytes 走 cv2/PIL 兼容分支。
+    """
+    if buf[:8] != _PNG_SIG:
+        h, w, c, flag = struct.unpack_from("<iiii", buf)
+        data = buf[16:]
+        if flag:
+            if _zstd_d is None:
+                raise RuntimeError("LMDB 载荷为 zstd 压缩，请安装 zstandard")
+            data = _zstd_d.decompress(data, max_output_size=h * w * c)
+        arr = np.frombuffer(data, dtype=np.uint8).reshape(h, w, c)
+        return Image.fromarray(arr)
+
+    # 旧格式: PNG bytes
+    if cv2 is not None:
+        arr = cv2.imdecode(np.frombuffer(buf, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if arr is not None:
+            return Image.fromarray(cv2.cvtColor(arr, cv2.COLOR_BGR2RGB))
+    return Image.open(io.BytesIO(buf)).convert("RGB")
+
+
+def pinned_collate(batch):
+    """
+    直接在页锁 (pinned) 内存中预分配 batch 张量并拷入样本。
+
+    默认 collate 先 stack 进普通内存、再由 DataLoader 的 pin 线程
+    整批复制一次；这里省掉那次全批 memcpy，并保证 H2D 传输
+    一定走页锁内存（配合 non_blocking=True 异步拷贝）。
+
+    注意: 页锁分配会初始化 CUDA，只能在主进程 (num_workers=0)
+    作为 collate_fn 使用；fork 出的 worker 进程中会直接报错。
+    """
+    x0, y0 = batch[0]
+    inputs = torch.empty((len(batch), *x0.shape), dtype=x0.dtype, pin_memory=True)
+    targets = torch.empty((len(batch), *y0.shape), dtype=y0.dtype, pin_memory=True)
+    for i, (x, y) in enumerate(batch):
+        inputs[i].copy_(x)
+        targets[i].copy_(y)
+    return inputs, targets
+
+
+def _close_env(env):
+    """关闭 env（atexit 回调，容忍重复/失败）。"""
+    try:
+        env.close()
+    except Exception:
+        pass
+
+
+# 进程内按路径共享的只读 env——多 Monitor 顺序训练或重建 DataLoader
+# 时复用同一份 mmap，省去重复的 open + map 开销
+_ENV_CACHE: dict = {}
+
+
+def _get_cached_env(lmdb_path: str):
+    env = _ENV_CACHE.get(lmdb_path)
+    if env is None:
+        env = lmdb.open(
+            lmdb_path,
+            readonly=True,
+            lock=False,
+            readahead=False,   # 乱序随机读下预读只浪费 I/O
+            meminit=False,
+            max_readers=max(TRAIN_CONFIG["NUM_WORKERS"] * 4, 128),
+        )
+        _ENV_CACHE[lmdb_path] = env
+        atexit.register(_close_env, env)
+    return env
+
+
+def _to_tensor(img: Image.Image) -> torch.Tensor:
+    """PIL Image → [0, 1] float tensor（from_numpy + 原地除法，免 torchvision）。"""
+    arr = np.asarray(img, dtype=np.uint8)
+    return torch.from_numpy(arr).permute(2, 0, 1).contiguous().float().div_(255.0)
+
 
 class AddRandomPerturbation:
     """
@@ -33,14 +128,19 @@ class AddRandomPerturbation:
         self.epsilon = epsilon
 
     def __call__(self, tensor: torch.Tensor) -> torch.Tensor:
-        noise = (torch.rand_like(tensor) * 2 - 1) * self.epsilon
-        return torch.clamp(tensor + noise, 0.0, 1.0)
+        # 原地加噪 + 原地 clamp——输入是 _to_tensor 新建的张量，原地安全；
+        # 该操作在 512×512×3 上是带宽瓶颈，少两次中间分配即近乎减半带宽
+        noise = torch.empty_like(tensor).uniform_(-self.epsilon, self.epsilon)
+        return tensor.add_(noise).clamp_(0.0, 1.0)
 
 
 class SynchronizedRandomCrop:
     """
     对 input 和 target 使用相同的随机裁剪区域。
     必须保证 (input, target) 裁剪位置一致。
+
+    pack_data 打包时已保证所有样本 ≥ crop_size，
+    热路径里不再有按需 resize 分支。
     """
 
     def __init__(self, crop_size: int):
@@ -49,18 +149,13 @@ class SynchronizedRandomCrop:
     def __call__(self, input_img: Image.Image, target_img: Image.Image):
         w, h = input_img.size
         cs = self.crop_size
-
-        # 如果图片比裁剪尺寸小，则 resize 到裁剪尺寸
-        if w < cs or h < cs:
-            scale = max(cs / w, cs / h)
-            new_w, new_h = int(w * scale) + 1, int(h * scale) + 1
-            input_img = input_img.resize((new_w, new_h), Image.BILINEAR)
-            target_img = target_img.resize((new_w, new_h), Image.BILINEAR)
-            w, h = new_w, new_h
+        assert w >= cs and h >= cs, (
+            f"样本 {w}x{h} 小于裁剪尺寸 {cs}，请重新运行 pack_data"
+        )
 
         # 随机选择裁剪起点
-        x = random.randint(0, w - cs)
-        y = random.randint(0, h - cs)
+        x = random.randrange(w - cs + 1)
+        y = random.randrange(h - cs + 1)
 
         input_crop = input_img.crop((x, y, x + cs, y + cs))
         target_crop = target_img.crop((x, y, x + cs, y + cs))
@@ -90,66 +185,83 @@ class LMDBDataset(Dataset):
         self.crop_size = crop_size
         self.is_training = is_training
 
-        # 打开 LMDB (只读模式, 不加锁以支持多进程 DataLoader)
-        self.env = lmdb.open(
-            lmdb_path,
-            readonly=True,
-            lock=False,
-            readahead=False,
-            meminit=False,
-        )
-
-        # 读取 Key 列表
-        with self.env.begin(write=False) as txn:
-            raw = txn.get(b"__keys__")
-            if raw is None:
-                raise ValueError(f"LMDB 中缺少 __keys__ 元信息: {lmdb_path}")
-            self.keys = pickle.loads(raw)
+        # env 延迟到每个 worker 的首次 __getitem__ 再打开——LMDB 句柄
+        # 不能跨进程边界
+        self.env = None
+
+        # Key 列表优先走 pack_data 写的旁路文件，__init__ 完全不碰 LMDB；
+        # 旁路缺失（旧打包产物）时回退临时打开 env 读 __keys__
+        keys_path = os.path.join(lmdb_path, "keys.pkl")
+        if os.path.isfile(keys_path):
+            with open(keys_path, "rb") as f:
+                self.keys = pickle.load(f)
+        else:
+            env = lmdb.open(
+                lmdb_path,
+                readonly=True,
+                lock=False,
+                readahead=False,
+                meminit=False,
+            )
+            try:
+                with env.begin(write=False) as txn:
+                    raw = txn.get(b"__keys__")
+                    if raw is None:
+                        raise ValueError(f"LMDB 中缺少 __keys__ 元信息: {lmdb_path}")
+                    self.keys = pickle.loads(raw)
+            finally:
+                env.close()
 
         # 同步随机裁剪
         self.sync_crop = SynchronizedRandomCrop(crop_size)
 
-        # ToTensor: PIL Image → [0, 1] float tensor
-        self.to_tensor = transforms.ToTensor()
-
         # 随机扰动 (仅用于 input)
         self.perturbation = AddRandomPerturbation(perturbation_epsilon)
 
     def __len__(self) -> int:
         return len(self.keys)
 
+    def _get_env(self):
+        """每个 worker 进程首次取样时拿到（或打开）共享只读 env。"""
+        if self.env is None:
+            self.env = _get_cached_env(self.lmdb_path)
+        return self.env
+
+    def close(self):
+        """显式关闭本数据集对应的 LMDB 环境（幂等，进程级共享缓存同步移除）。"""
+        env = _ENV_CACHE.pop(self.lmdb_path, None)
+        if env is not None:
+            _close_env(env)
+        self.env = None
+
     def __getitem__(self, index: int):
         key = self.keys[index]
 
-        with self.env.begin(write=False) as txn:
-            raw = txn.get(key.encode("utf-8"))
-            if raw is None:
-                raise KeyError(f"LMDB 中找不到 key: {key}")
-
-        data = pickle.loads(raw)
+        with self._get_env().begin(write=False) as txn:
+            raw_input = txn.get(f"{key}:input".encode("utf-8"))
+            raw_target = txn.get(f"{key}:target".encode("utf-8"))
+            if raw_input is None or raw_target is None:
+                # 兼容旧格式: 单 key + pickle dict
+                raw = txn.get(key.encode("utf-8"))
+                if raw is None:
+                    raise KeyError(f"LMDB 中找不到 key: {key}")
+                data = pickle.loads(raw)
+                raw_input, raw_target = data["input"], data["target"]
 
         # 解码为 PIL Image
-        input_img = Image.open(io.BytesIO(data["input"])).convert("RGB")
-        target_img = Image.open(io.BytesIO(data["target"])).convert("RGB")
+        input_img = _decode_image(raw_input)
+        target_img = _decode_image(raw_target)
 
         if self.is_training:
             # 同步随机裁剪
             input_img, target_img = self.sync_crop(input_img, target_img)
 
         # 转为 Tensor [0, 1]
-        input_tensor = self.to_tensor(input_img)
-        target_tensor = self.to_tensor(target_img)
+        input_tensor = _to_tensor(input_img)
+        target_tensor = _to_tensor(target_img)
 
         if self.is_training:
             # 对 input 添加随机扰动 δ'
             input_tensor = self.perturbation(input_tensor)
 
         return input_tensor, target_tensor
-
-    def __del__(self):
-        """安全关闭 LMDB 环境。"""
-        if hasattr(self, "env") and self.env is not None:
-            try:
-                self.env.close()
-            except Exception:
-                pass
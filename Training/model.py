@@ -9,6 +9,35 @@
 
 import torch
 import torch.nn as nn
+import torch.utils.checkpoint
+
+
+def _fuse_conv_bn(conv: nn.Conv2d, bn: nn.BatchNorm2d) -> nn.Conv2d:
+    """
+    把 BatchNorm 的缩放/平移折叠进前面的 Conv2d。
+
+    w' = w · γ/√(σ²+ε)，b' = β + (b - μ) · γ/√(σ²+ε)
+    推理时省掉一次 BN 内核与一遍内存读写。
+    """
+    fused = nn.Conv2d(
+        conv.in_channels,
+        conv.out_channels,
+        kernel_size=conv.kernel_size,
+        stride=conv.stride,
+        padding=conv.padding,
+        dilation=conv.dilation,
+        groups=conv.groups,
+        bias=True,
+    )
+    scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+    fused.weight.data = conv.weight.data * scale.reshape(-1, 1, 1, 1)
+    conv_bias = (
+        conv.bias.data
+        if conv.bias is not None
+        else torch.zeros_like(bn.running_mean)
+    )
+    fused.bias.data = bn.bias.data + (conv_bias - bn.running_mean) * scale
+    return fused
 
 
 class DoubleConv(nn.Module):
@@ -16,6 +45,9 @@ class DoubleConv(nn.Module):
 
     def __init__(self, in_channels: int, out_channels: int):
         super().__init__()
+        # use_checkpoint=True 时训练期用激活重计算换显存（UNet 只为
+        # 激活最大的瓶颈块打开，见 UNet.__init__）
+        self.use_checkpoint = False
         self.double_conv = nn.Sequential(
             nn.Conv2d(in_channels, out_channels, kernel_size=3, padding=1, bias=False),
             nn.BatchNorm2d(out_channels),
@@ -26,6 +58,10 @@ class DoubleConv(nn.Module):
         )
 
     def forward(self, x: torch.Tensor) -> torch.Tensor:
+        if self.use_checkpoint and self.training:
+            return torch.utils.checkpoint.checkpoint(
+                self.double_conv, x, use_reentrant=False
+            )
         return self.double_conv(x)
 
 
@@ -46,23 +82,35 @@ class Down(nn.Module):
 class Up(nn.Module):
     """上采样 => 拼接 Skip Connection => DoubleConv"""
 
-    def __init__(self, in_channels: int, out_channels: int):
+    def __init__(
+        self, in_channels: int, out_channels: int, static_shapes: bool = False
+    ):
         super().__init__()
-        self.up = nn.ConvTranspose2d(
-            in_channels, in_channels // 2, kernel_size=2, stride=2
+        # static_shapes: 输入尺寸保证能被 16 整除（见 UNet.for_size）时
+        # 上下采样严格对称，forward 不读任何张量形状——直线代码，
+        # torch.compile(dynamic=False) 下不产生形状 guard
+        self.static_shapes = static_shapes
+        # 双线性上采样 + 1×1 conv 取代 2×2 转置卷积：
+        # FLOPs 约为其 1/4，且避免转置卷积的棋盘伪影
+        self.up = nn.Sequential(
+            nn.Upsample(scale_factor=2, mode="bilinear", align_corners=False),
+            nn.Conv2d(in_channels, in_channels // 2, kernel_size=1, bias=False),
         )
         self.conv = DoubleConv(in_channels, out_channels)
 
     def forward(self, x1: torch.Tensor, x2: torch.Tensor) -> torch.Tensor:
         x1 = self.up(x1)
 
-        # 处理因 MaxPool 导致的尺寸差异 (保证 same padding 语义)
-        diff_y = x2.size(2) - x1.size(2)
-        diff_x = x2.size(3) - x1.size(3)
-        x1 = nn.functional.pad(
-            x1, [diff_x // 2, diff_x - diff_x // 2,
-                 diff_y // 2, diff_y - diff_y // 2]
-        )
+        # 处理因 MaxPool 导致的尺寸差异 (保证 same padding 语义)。
+        # 训练尺寸 (CROP_SIZE=512) 各级都是 2 的幂，diff 恒为 0——
+        # 只在真正需要时 pad，训练路径不发无效内核、不破坏图捕获
+        if not self.static_shapes and x1.shape[-2:] != x2.shape[-2:]:
+            diff_y = x2.size(2) - x1.size(2)
+            diff_x = x2.size(3) - x1.size(3)
+            x1 = nn.functional.pad(
+                x1, [diff_x // 2, diff_x - diff_x // 2,
+                     diff_y // 2, diff_y - diff_y // 2]
+            )
 
         x = torch.cat([x2, x1], dim=1)
         return self.conv(x)
@@ -78,7 +126,13 @@ class UNet(nn.Module):
     ─────────────────────────────────────
     """
 
-    def __init__(self, in_channels: int = 3, out_channels: int = 3):
+    def __init__(
+        self,
+        in_channels: int = 3,
+        out_channels: int = 3,
+        checkpoint_bottleneck: bool = False,
+        static_shapes: bool = False,
+    ):
         super().__init__()
 
         # Encoder (下采样路径)
@@ -89,14 +143,34 @@ class UNet(nn.Module):
         self.down4 = Down(512, 1024)
 
         # Decoder (上采样路径)
-        self.up1 = Up(1024, 512)
-        self.up2 = Up(512, 256)
-        self.up3 = Up(256, 128)
-        self.up4 = Up(128, 64)
+        self.up1 = Up(1024, 512, static_shapes=static_shapes)
+        self.up2 = Up(512, 256, static_shapes=static_shapes)
+        self.up3 = Up(256, 128, static_shapes=static_shapes)
+        self.up4 = Up(128, 64, static_shapes=static_shapes)
 
         # 输出层: 1×1 conv, 无 Activation (Linear output for MSELoss)
         self.outc = nn.Conv2d(64, out_channels, kernel_size=1)
 
+        if checkpoint_bottleneck:
+            # 只在激活体积相对 FLOPs 最大的瓶颈块上开启激活重计算，
+            # 约 30% 额外计算换近半激活显存，可把 batch 提上一档
+            self.down3.maxpool_conv[1].use_checkpoint = True
+            self.down4.maxpool_conv[1].use_checkpoint = True
+            self.up1.conv.use_checkpoint = True
+
+    @classmethod
+    def for_size(cls, size: int, **kwargs) -> "UNet":
+        """
+        为已知输入尺寸构造特化实例。
+
+        尺寸能被 16 (4 级 MaxPool) 整除时各级特征图严格对称，
+        Up.forward 不再读取/比较张量形状——整个 forward 是无分支
+        直线代码，torch.compile(dynamic=False) 可按单一形状生成
+        单态内核，不留形状 guard。
+        """
+        assert size % 16 == 0, f"输入尺寸 {size} 无法被 16 整除，无法特化"
+        return cls(static_shapes=True, **kwargs)
+
     def forward(self, x: torch.Tensor) -> torch.Tensor:
         # Encoder
         x1 = self.inc(x)     # 64
@@ -113,6 +187,27 @@ class UNet(nn.Module):
 
         return self.outc(x)   # 3
 
+    @torch.no_grad()
+    def fuse_for_inference(self) -> "UNet":
+        """
+        就地融合所有 DoubleConv 里的 Conv2d + BatchNorm2d 对（部署用）。
+
+        训练完成后、保存部署权重前调用；融合后 BN 替换为 Identity，
+        数值输出与 eval 模式逐位等价（浮点误差内）。
+        """
+        assert not self.training, "先调用 eval() 再融合"
+        for module in self.modules():
+            if not isinstance(module, DoubleConv):
+                continue
+            seq = module.double_conv
+            for i in range(len(seq) - 1):
+                if isinstance(seq[i], nn.Conv2d) and isinstance(
+                    seq[i + 1], nn.BatchNorm2d
+                ):
+                    seq[i] = _fuse_conv_bn(seq[i], seq[i + 1])
+                    seq[i + 1] = nn.Identity()
+        return self
+
 
 if __name__ == "__main__":
     # 快速验证: 输入输出尺寸一致
@@ -127,3 +222,14 @@ if __name__ == "__main__":
     # 参数量统计
     total_params = sum(p.numel() for p in model.parameters())
     print(f"Total parameters: {total_params:,}")
+
+    # Conv+BN 融合后输出应与 eval 模式一致
+    model.eval()
+    with torch.no_grad():
+        ref = model(dummy)
+        model.fuse_for_inference()
+        fused_out = model(dummy)
+    diff = (ref - fused_out).abs().max().item()
+    print(f"Fused max diff: {diff:.2e}")
+    assert diff < 1e-4, "Conv+BN 融合输出不一致!"
+    print("✓ Conv+BN 融合验证通过")
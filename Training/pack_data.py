@@ -10,11 +10,25 @@
 
 import json
 import os
-import io
 import pickle
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
 import lmdb
+import numpy as np
 from PIL import Image
 
+try:
+    import zstandard  # 原始像素的轻量压缩，解压比 PNG inflate 快约 5 倍
+except ImportError:
+    zstandard = None
+
+# 每个进程一个压缩器（worker 进程 import 本模块时各自创建）
+_ZSTD_C = zstandard.ZstdCompressor(level=3) if zstandard is not None else None
+
+# 每个写事务包含的样本数
+_TXN_BATCH = 256
+
 from config import (
     DATASET_METADATA_JSON,
     SCREENSHOTS_DIR,
@@ -24,21 +38,46 @@ from config import (
 )
 
 
-def _read_image_bytes(path: str) -> bytes:
-    """读取图片并转换为 PNG bytes (统一格式，节省体积)。"""
+def _read_image_payload(path: str) -> bytes:
+    """
+    读取图片并编码为自描述的原始像素载荷。
+
+    布局: struct("<iiii", H, W, C, zstd_flag) + 像素数据。
+    训练端只需 frombuffer + reshape（或一次 zstd 解压），
+    不再每个 epoch 重复做 PNG inflate。
+    """
+    with Image.open(path) as img:
+        arr = np.asarray(img.convert("RGB"), dtype=np.uint8)
+    data = arr.tobytes()
+    flag = 0
+    if _ZSTD_C is not None:
+        data = _ZSTD_C.compress(data)
+        flag = 1
+    h, w, c = arr.shape
+    return struct.pack("<iiii", h, w, c, flag) + data
+
+
+def _read_pair(args):
+    """进程池任务：解码+重编码一对 (input, target) 图片。"""
+    idx, input_path, target_path = args
+    return idx, _read_image_payload(input_path), _read_image_payload(target_path)
+
+
+def _image_too_small(path: str, min_size: int) -> bool:
+    """检查图片任一边是否小于 min_size（只读头部，不解码像素）。"""
     with Image.open(path) as img:
-        buf = io.BytesIO()
-        img.save(buf, format="PNG")
-        return buf.getvalue()
+        w, h = img.size
+    return w < min_size or h < min_size
 
 
 def pack_monitor_lmdb(monitor_name: str, records: list, lmdb_dir: str) -> None:
     """
     将某个 Monitor 的所有 (raw, icc) 图片对打包进一个 LMDB。
 
-    Key 设计: f"{monitor_name}_{index:08d}"
-    Value:    pickle.dumps({"input": raw_png_bytes, "target": icc_png_bytes})
-    Meta:     b"__keys__" → pickle.dumps(all_key_list)
+    Key 设计: f"{monitor_name}_{index:08d}:input" / f"...:target"
+              每个样本两个 key，存自描述的原始像素载荷
+              （见 _read_image_payload）——读取端免去 pickle 与 PNG 解码
+    Meta:     b"__keys__" → pickle.dumps(all_key_list)（不含后缀）
     """
     lmdb_path = os.path.join(lmdb_dir, f"{monitor_name}.lmdb")
     os.makedirs(lmdb_dir, exist_ok=True)
@@ -73,6 +112,15 @@ def pack_monitor_lmdb(monitor_name: str, records: list, lmdb_dir: str) -> None:
             skipped += 1
             continue
 
+        # 小于裁剪尺寸的样本在打包期剔除，
+        # DataLoader 热路径因此不需要 resize 分支
+        crop_size = TRAIN_CONFIG["CROP_SIZE"]
+        if _image_too_small(input_path, crop_size) or _image_too_small(
+            target_path, crop_size
+        ):
+            skipped += 1
+            continue
+
         samples.append((input_path, target_path))
 
     if not samples:
@@ -81,34 +129,65 @@ def pack_monitor_lmdb(monitor_name: str, records: list, lmdb_dir: str) -> None:
 
     print(f"  [{monitor_name}] 有效样本: {len(samples)}, 跳过: {skipped}")
 
-    # 估算 LMDB map_size: 每张 4K PNG 约 20MB，× 2 (input+target) × 样本数 × 1.5 安全系数
-    estimated_size = len(samples) * 2 * 20 * 1024 * 1024
+    # 估算 LMDB map_size: 每张 4K 原始像素约 33MB (zstd 后更小)，
+    # × 2 (input+target) × 样本数，再 × 2 安全系数
+    estimated_size = len(samples) * 2 * 33 * 1024 * 1024
     map_size = max(estimated_size * 2, 1 * 1024 * 1024 * 1024)  # 至少 1GB
 
-    env = lmdb.open(lmdb_path, map_size=map_size)
-    keys = []
-
-    with env.begin(write=True) as txn:
-        for idx, (input_path, target_path) in enumerate(samples):
-            key = f"{monitor_name}_{idx:08d}"
-            keys.append(key)
-
-            print(f"    打包 [{idx + 1}/{len(samples)}] {key}", end="\r")
-
-            input_bytes = _read_image_bytes(input_path)
-            target_bytes = _read_image_bytes(target_path)
-
-            value = pickle.dumps({
-                "input": input_bytes,
-                "target": target_bytes,
-            })
-
-            txn.put(key.encode("utf-8"), value)
-
-        # 存储所有 Key 的索引
-        txn.put(b"__keys__", pickle.dumps(keys))
-
+    # writemap+map_async+sync=False: 写入直接走页缓存、免一次 memcpy，
+    # 落盘推迟到结尾的显式 env.sync；打包吞吐只受顺序盘带宽限制
+    env = lmdb.open(
+        lmdb_path,
+        map_size=map_size,
+        writemap=True,
+        map_async=True,
+        sync=False,
+        meminit=False,
+    )
+    keys = [f"{monitor_name}_{idx:08d}" for idx in range(len(samples))]
+
+    # 图片解码+重编码是 CPU 密集的纯 C 工作，交给进程池并行；
+    # LMDB 只允许单写者，主进程串行消费结果写入
+    tasks = [
+        (idx, input_path, target_path)
+        for idx, (input_path, target_path) in enumerate(samples)
+    ]
+
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+        done = 0
+        txn = env.begin(write=True)
+        try:
+            for idx, input_bytes, target_bytes in pool.map(
+                _read_pair, tasks, chunksize=16
+            ):
+                key = keys[idx]
+                txn.put(f"{key}:input".encode("utf-8"), input_bytes)
+                txn.put(f"{key}:target".encode("utf-8"), target_bytes)
+
+                done += 1
+                print(f"    打包 [{done}/{len(samples)}] {key}", end="\r")
+
+                # 每 256 个样本提交一次，限制脏页窗口，
+                # 中断后也只损失最后一批
+                if done % _TXN_BATCH == 0:
+                    txn.commit()
+                    txn = env.begin(write=True)
+
+            # 存储所有 Key 的索引（协议 5，字节载荷序列化/反序列化更快）
+            txn.put(
+                b"__keys__", pickle.dumps(keys, protocol=pickle.HIGHEST_PROTOCOL)
+            )
+            txn.commit()
+        except BaseException:
+            txn.abort()
+            raise
+
+    env.sync(force=True)
     env.close()
+
+    # 旁路 Key 文件——DataLoader 父进程读它即可，无需打开 LMDB
+    with open(os.path.join(lmdb_path, "keys.pkl"), "wb") as f:
+        pickle.dump(keys, f, protocol=pickle.HIGHEST_PROTOCOL)
     print(f"    ✓ {monitor_name}: {len(keys)} 样本已打包 → {lmdb_path}")
 
 
@@ -40,15 +40,18 @@
 import os
 import time
 import datetime
+import functools
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 import torch
-import torch.nn as nn
+import torch.nn.functional as F
 import torch.optim as optim
 from torch.utils.data import DataLoader
 
 from config import TRAIN_CONFIG, MONITORS
 from model import UNet
-from dataset import LMDBDataset
+from dataset import LMDBDataset, pinned_collate
 
 
 class Trainer:
@@ -80,15 +83,114 @@ class Trainer:
         self.dataloader = self._build_dataloader()
 
         # --- 模型 / 优化器 / 调度器 ---
-        self.model = UNet(in_channels=3, out_channels=3).to(self.device)
-        self.criterion = nn.MSELoss()
-        self.optimizer = optim.Adam(
-            self.model.parameters(), lr=TRAIN_CONFIG["LEARNING_RATE"]
+        # 裁剪尺寸能被 16 整除时走静态形状特化——forward 无形状分支，
+        # compile/CUDA Graph 拿到直线计算图
+        crop_size = TRAIN_CONFIG["CROP_SIZE"]
+        model_kwargs = dict(
+            in_channels=3,
+            out_channels=3,
+            checkpoint_bottleneck=bool(TRAIN_CONFIG.get("USE_CHECKPOINT")),
         )
+        if crop_size % 16 == 0:
+            self.model = UNet.for_size(crop_size, **model_kwargs).to(self.device)
+        else:
+            self.model = UNet(**model_kwargs).to(self.device)
+        # NHWC 布局: cuDNN 半精度/TF32 conv 的最快内核要求 channels_last，
+        # 与 AMP 组合免去 NCHW↔NHWC 往返转置
+        self.channels_last = self.device.type == "cuda"
+        if self.channels_last:
+            self.model = self.model.to(memory_format=torch.channels_last)
+        # Checkpoint 始终针对原始模块读写——torch.compile 包装会给
+        # state_dict 键加 _orig_mod. 前缀，绕开它保证与 eager 运行互通
+        self._eager_model = self.model
+        if (
+            TRAIN_CONFIG.get("USE_COMPILE")
+            and self.device.type == "cuda"
+            and hasattr(torch, "compile")
+        ):
+            # 固定 batch/crop 下整图形状静态，是 reduce-overhead
+            # (Inductor 融合 + CUDA Graph 重放) 的理想场景；
+            # dynamic=False 让 Inductor 按单一形状生成单态内核
+            self.model = torch.compile(
+                self.model, mode="reduce-overhead", fullgraph=True, dynamic=False
+            )
+            print("  [Compile] torch.compile 已启用 (reduce-overhead)")
+        # 两种损失都走单趟融合归约内核（不落地 48MB 的 diff² 中间张量）；
+        # smooth_l1 在 [0,1] 色彩回归上数值与 MSE 接近，β=0.01 之外
+        # 转为 L1，对渲染毛刺等离群像素梯度更稳
+        if TRAIN_CONFIG.get("LOSS", "mse") == "smooth_l1":
+            self.criterion = functools.partial(F.smooth_l1_loss, beta=0.01)
+        else:
+            self.criterion = F.mse_loss
+        # --- 混合精度: 3×3 conv 主导的 UNet 是 Tensor Core 的典型受益者 ---
+        # Ampere+ 用 bf16（数值范围同 fp32，无需缩放），否则 fp16+GradScaler
+        self.use_amp = (
+            bool(TRAIN_CONFIG.get("USE_AMP")) and self.device.type == "cuda"
+        )
+        self.amp_dtype = (
+            torch.bfloat16
+            if self.use_amp and torch.cuda.is_bf16_supported()
+            else torch.float16
+        )
+        self.scaler = torch.amp.GradScaler(
+            "cuda", enabled=self.use_amp and self.amp_dtype == torch.float16
+        )
+        if self.use_amp:
+            print(f"  [AMP] 混合精度已启用 ({self.amp_dtype})")
+
+        # --- CUDA Graph: 固定形状训练步的整步重放 ---
+        # reduce-overhead 的 torch.compile 自带 graph 重放，二者互斥；
+        # 实际捕获延迟到前几个真实 batch 热身之后（见 _train_one_epoch）
+        self._graph = None
+        self._graph_wanted = (
+            TRAIN_CONFIG.get("USE_CUDA_GRAPH")
+            and self.device.type == "cuda"
+            and self.model is self._eager_model
+            # GradScaler.step 含 CPU 同步，无法进图；bf16 无缩放不受限
+            and not self.scaler.is_enabled()
+        )
+        self._graph_warmup_left = 3
+
+        # fused Adam 把各参数张量的动量更新合并为单个 multi-tensor 内核，
+        # 每步省几十次小内核调度（CUDA 专属）；打算捕获 CUDA Graph 时
+        # 必须 capturable=True（step 的状态张量留在 GPU 上，否则捕获期
+        # 的健康检查直接报错），代价是 eager 步多一次 GPU 端 lr 读取；
+        # 其他设备退回 foreach 的横向批量实现
+        if self.device.type == "cuda":
+            lr = TRAIN_CONFIG["LEARNING_RATE"]
+            if self._graph_wanted:
+                # 图里固化的是对 lr 存储的读取：Python float 会被整个
+                # 烘进捕获的内核，余弦调度从此失效；GPU 张量则由
+                # 调度器每 epoch 原地 fill_ 新值，重放即可见
+                lr = torch.tensor(lr, device=self.device)
+            self.optimizer = optim.Adam(
+                self.model.parameters(),
+                lr=lr,
+                fused=True,
+                capturable=bool(self._graph_wanted),
+            )
+        else:
+            self.optimizer = optim.Adam(
+                self.model.parameters(),
+                lr=TRAIN_CONFIG["LEARNING_RATE"],
+                foreach=True,
+            )
         self.scheduler = optim.lr_scheduler.CosineAnnealingLR(
             self.optimizer, T_max=self.num_epochs
         )
 
+        # 并发训练时由 train_concurrent 赋值，各 Trainer 一条 stream
+        self.stream = None
+
+        # --- 异步 Checkpoint 写线程 ---
+        # 状态先拷到 CPU，序列化+落盘移出训练线程，磁盘写与下个
+        # epoch 的 GPU 计算重叠；单 worker 保证写入顺序
+        self._save_pool = ThreadPoolExecutor(max_workers=1)
+        self._pending_save = None
+        # 上次落盘时的参数内容哈希——权重没变（NaN 早停、恢复循环
+        # 空转等异常场景）时跳过重复写盘
+        self._last_model_hash = None
+
         # --- 断点续传: 自动恢复 Checkpoint ---
         self._resume_from_checkpoint()
 
@@ -99,6 +201,12 @@ class Trainer:
         """自动选择最佳计算设备。"""
         if torch.cuda.is_available():
             device = torch.device("cuda")
+            # 每个 iteration 形状完全相同 (固定 batch/crop)，benchmark
+            # 模式让 cuDNN 按形状选一次最快算法后缓存；TF32 使 FP32
+            # matmul/conv 走 Tensor Core，对 MSE 回归精度影响可忽略
+            torch.backends.cudnn.benchmark = True
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
             print(f"[Device] CUDA: {torch.cuda.get_device_name(0)}")
         elif hasattr(torch.backends, "mps") and torch.backends.mps.is_available():
             device = torch.device("mps")
@@ -128,13 +236,26 @@ class Trainer:
             print(f"  [!] 数据集为空: {self.monitor_name}")
             return None
 
+        # pinned_collate 直接在页锁内存里预分配 batch，省掉 pin 线程的
+        # 整批二次拷贝——但页锁分配会初始化 CUDA，只能在主进程做
+        # （fork 出的 worker 里会 RuntimeError），因此仅 num_workers=0
+        # 时启用；多 worker 时退回 DataLoader 自带的 pin_memory 线程
+        use_pinned = TRAIN_CONFIG["PIN_MEMORY"] and torch.cuda.is_available()
+        num_workers = TRAIN_CONFIG["NUM_WORKERS"]
+        use_pinned_collate = use_pinned and num_workers == 0
         dataloader = DataLoader(
             dataset,
             batch_size=TRAIN_CONFIG["BATCH_SIZE"],
             shuffle=True,
-            num_workers=TRAIN_CONFIG["NUM_WORKERS"],
-            pin_memory=TRAIN_CONFIG["PIN_MEMORY"],
+            num_workers=num_workers,
+            pin_memory=use_pinned and not use_pinned_collate,
+            collate_fn=pinned_collate if use_pinned_collate else None,
             drop_last=True,
+            # worker 跨 epoch 常驻——LMDB env 与页缓存不必每个 epoch 重建
+            persistent_workers=num_workers > 0,
+            prefetch_factor=(
+                TRAIN_CONFIG["PREFETCH_FACTOR"] if num_workers > 0 else None
+            ),
         )
 
         print(f"  样本数: {len(dataset)}")
@@ -154,25 +275,79 @@ class Trainer:
             self.checkpoint_dir, f"{self.monitor_name}_epoch_{epoch:04d}.pth"
         )
 
-    def _save_checkpoint(self, path: str, epoch: int, loss: float) -> None:
+    @staticmethod
+    def _to_cpu(obj):
+        """递归把 state_dict 里的张量拷到 CPU（其余对象原样返回）。"""
+        if torch.is_tensor(obj):
+            return obj.detach().to("cpu", copy=True)
+        if isinstance(obj, dict):
+            return {k: Trainer._to_cpu(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [Trainer._to_cpu(v) for v in obj]
+        return obj
+
+    def _finish_pending_save(self) -> None:
+        """等待上一次后台保存完成（传播其中的异常）。"""
+        if self._pending_save is not None:
+            self._pending_save.result()
+            self._pending_save = None
+
+    def _model_hash(self) -> str:
+        """首个参数张量的 64-bit 内容哈希（采样探测权重是否变化）。"""
+        p = next(self._eager_model.parameters())
+        return hashlib.blake2b(
+            p.detach().cpu().numpy().tobytes(), digest_size=8
+        ).hexdigest()
+
+    def _save_checkpoint(
+        self, path: str, epoch: int, loss: float, include_optimizer: bool = True
+    ) -> None:
         """
-        原子保存 Checkpoint。
-        先写入 .tmp 文件，再通过 os.replace 原子覆盖目标文件，
+        异步原子保存 Checkpoint。
+
+        训练线程只做 D2H 快照拷贝（几百 MB 的 memcpy），
+        耗时大头——pickle 序列化与磁盘写——交给后台线程，
+        与下一个 epoch 的 GPU 计算重叠。
+        落盘仍走先写 .tmp 再 os.replace 的原子路径，
         防止在保存瞬间实例中断导致权重文件损坏。
+
+        include_optimizer=False 时只存模型权重（轻量保存，写量约 1/3）；
+        优化器动量仅在完整保存时落盘——Adam 重启后收敛很快，
+        中途恢复极少真正需要它们。
         """
+        # 权重内容没变就不重复写盘（健康训练中不会发生，
+        # 拦截的是 NaN 早停、恢复循环空转这类异常场景）
+        model_hash = self._model_hash()
+        if not include_optimizer and model_hash == self._last_model_hash:
+            print(f"  [Skip] 权重未变化，跳过 Checkpoint: {path}")
+            return
+
+        # 串行化: 上一次没写完就先等，保证磁盘上永远是最新完整状态
+        self._finish_pending_save()
+
+        # 快照必须在提交前完成——后台写的是此刻的副本，
+        # 之后 GPU 继续更新权重也不会污染文件内容
         state = {
             "epoch": epoch,
-            "model_state_dict": self.model.state_dict(),
-            "optimizer_state_dict": self.optimizer.state_dict(),
-            "scheduler_state_dict": (
-                self.scheduler.state_dict() if self.scheduler else None
-            ),
+            "model_state_dict": self._to_cpu(self._eager_model.state_dict()),
             "loss": loss,
             "timestamp": datetime.datetime.now().isoformat(),
         }
-        tmp_path = path + ".tmp"
-        torch.save(state, tmp_path)
-        os.replace(tmp_path, path)  # 原子操作
+        if include_optimizer:
+            state["optimizer_state_dict"] = self._to_cpu(
+                self.optimizer.state_dict()
+            )
+            state["scheduler_state_dict"] = (
+                self.scheduler.state_dict() if self.scheduler else None
+            )
+
+        def _write():
+            tmp_path = path + ".tmp"
+            torch.save(state, tmp_path)
+            os.replace(tmp_path, path)  # 原子操作
+
+        self._pending_save = self._save_pool.submit(_write)
+        self._last_model_hash = model_hash
 
     def _load_checkpoint(self, path: str) -> int:
         """
@@ -181,8 +356,18 @@ class Trainer:
         """
         checkpoint = torch.load(path, map_location=self.device, weights_only=False)
 
-        self.model.load_state_dict(checkpoint["model_state_dict"])
-        self.optimizer.load_state_dict(checkpoint["optimizer_state_dict"])
+        # 兼容老 checkpoint 中 compiled 运行留下的 _orig_mod. 前缀
+        model_state = {
+            k.removeprefix("_orig_mod."): v
+            for k, v in checkpoint["model_state_dict"].items()
+        }
+        self._eager_model.load_state_dict(model_state)
+
+        # 轻量 checkpoint 不含优化器/调度器状态（Adam 重启后收敛很快）
+        if checkpoint.get("optimizer_state_dict"):
+            self.optimizer.load_state_dict(checkpoint["optimizer_state_dict"])
+        else:
+            print("  [Resume] 轻量 Checkpoint，优化器状态重新初始化")
 
         if self.scheduler and checkpoint.get("scheduler_state_dict"):
             self.scheduler.load_state_dict(checkpoint["scheduler_state_dict"])
@@ -206,40 +391,154 @@ class Trainer:
 
     # -------------------- 训练 --------------------
 
-    def _train_one_epoch(self, epoch: int) -> float:
-        """执行单个 epoch 的训练，返回平均 loss。"""
-        assert self.dataloader is not None, "DataLoader 未初始化"
+    def _capture_cuda_graph(self, inputs, targets) -> None:
+        """
+        把 forward → loss → backward → step 整步捕获成 CUDA Graph。
 
-        self.model.train()
-        epoch_loss = 0.0
-        batch_count = 0
+        UNet 的 batch / crop 形状固定，每个 batch 只需把数据 copy_ 进
+        静态缓冲区后 replay，一次图启动取代上百次内核调度。
+        梯度张量位于图的私有内存池，replay 时被确定性覆写，
+        迭代之间无需 zero_grad。
+        """
+        self._static_in = inputs.clone()
+        self._static_tgt = targets.clone()
+        torch.cuda.synchronize()
+
+        self._graph = torch.cuda.CUDAGraph()
+        self.optimizer.zero_grad(set_to_none=True)
+        with torch.cuda.graph(self._graph):
+            # cache_enabled=False: autocast 的权重半精度缓存跨步复用，
+            # 进图会把缓存张量固化，捕获期必须关掉
+            with torch.autocast(
+                device_type="cuda", dtype=self.amp_dtype, enabled=self.use_amp,
+                cache_enabled=False,
+            ):
+                static_out = self.model(self._static_in)
+                self._static_loss = self.criterion(static_out, self._static_tgt)
+            self._static_loss.backward()
+            self.optimizer.step()
 
-        for batch_idx, (inputs, targets) in enumerate(self.dataloader):
+        self._graph_wanted = False
+        print("  [CUDAGraph] 训练步已捕获，后续 batch 整图重放")
+
+    def _train_step(self, inputs, targets) -> torch.Tensor:
+        """执行单个 batch 的完整训练步，返回本步 loss（仍在 device 上）。"""
+        if self.channels_last:
+            inputs = inputs.to(
+                self.device, non_blocking=True,
+                memory_format=torch.channels_last,
+            )
+            targets = targets.to(
+                self.device, non_blocking=True,
+                memory_format=torch.channels_last,
+            )
+        else:
             inputs = inputs.to(self.device, non_blocking=True)
             targets = targets.to(self.device, non_blocking=True)
 
-            # Forward
+        if self._graph is not None:
+            # 图重放路径: 数据拷进静态缓冲区，一次 replay 完成整步
+            self._static_in.copy_(inputs, non_blocking=True)
+            self._static_tgt.copy_(targets, non_blocking=True)
+            self._graph.replay()
+            return self._static_loss.detach()
+
+        # Forward (autocast 下 conv 走半精度，MSE 自动提回 fp32)
+        with torch.autocast(
+            device_type="cuda" if self.use_amp else "cpu",
+            dtype=self.amp_dtype,
+            enabled=self.use_amp,
+        ):
             outputs = self.model(inputs)
             loss = self.criterion(outputs, targets)
 
-            # Backward
-            self.optimizer.zero_grad()
-            loss.backward()
-            self.optimizer.step()
+        # Backward (scaler 未启用时 scale/step 透传)。
+        # set_to_none: 省掉 31M 参数的 memset——backward 反正会覆写
+        self.optimizer.zero_grad(set_to_none=True)
+        self.scaler.scale(loss).backward()
+        self.scaler.step(self.optimizer)
+        self.scaler.update()
+
+        # 前几个真实 batch 作为热身，之后捕获训练步
+        if self._graph_wanted:
+            self._graph_warmup_left -= 1
+            if self._graph_warmup_left <= 0:
+                self._capture_cuda_graph(inputs, targets)
+
+        return loss.detach()
+
+    def _end_of_epoch(self, epoch: int, avg_loss: float, elapsed: float) -> None:
+        """epoch 收尾: 调度器步进、日志打印与按间隔保存 Checkpoint。"""
+        self.scheduler.step()
+        current_lr = self.optimizer.param_groups[0]["lr"]
+
+        print(
+            f"  [{self.monitor_name}] Epoch [{epoch + 1}/{self.num_epochs}] "
+            f"Avg Loss: {avg_loss:.6f} | "
+            f"LR: {current_lr:.6f} | "
+            f"Time: {elapsed:.1f}s"
+        )
+
+        if (epoch + 1) % self.save_interval == 0:
+            # 每 10 个 epoch 做一次完整保存（含优化器动量，~3× 写量）
+            # 并留一份带编号的副本；其余 epoch 只存模型权重
+            full = (epoch + 1) % 10 == 0
+            self._save_checkpoint(
+                self.latest_checkpoint_path, epoch, avg_loss,
+                include_optimizer=full,
+            )
+            if full:
+                epoch_path = self._epoch_checkpoint_path(epoch + 1)
+                self._save_checkpoint(epoch_path, epoch, avg_loss)
+                print(f"  Checkpoint 已保存: {epoch_path}")
+
+    def _train_one_epoch(self, epoch: int) -> float:
+        """执行单个 epoch 的训练，返回平均 loss。"""
+        assert self.dataloader is not None, "DataLoader 未初始化"
+
+        self.model.train()
+        # loss 累加在显存里进行，整个 epoch 只在结尾同步一次——
+        # 每个 batch 的 .item() 都会清空 CUDA 命令队列，抵消图重放收益
+        loss_buf = torch.zeros((), device=self.device)
+        batch_count = 0
+
+        # 进度打印用异步 D2H 快照，显示上一个打印点的值，不强制同步
+        async_progress = self.device.type == "cuda"
+        if async_progress:
+            loss_snapshot = torch.zeros((), pin_memory=True)
+            snapshot_ready = torch.cuda.Event()
+            have_snapshot = False
 
-            epoch_loss += loss.item()
+        for batch_idx, (inputs, targets) in enumerate(self.dataloader):
+            loss = self._train_step(inputs, targets)
+
+            loss_buf += loss
             batch_count += 1
 
             # 每 10 个 batch 打印一次进度
             if (batch_idx + 1) % 10 == 0 or (batch_idx + 1) == len(self.dataloader):
+                if async_progress:
+                    # 显示上一个打印点的快照（晚 10 个 batch，无同步），
+                    # 并异步发起本次快照的 D2H 拷贝
+                    shown = (
+                        f"{loss_snapshot.item():.6f}"
+                        if have_snapshot and snapshot_ready.query()
+                        else "..."
+                    )
+                    loss_snapshot.copy_(loss, non_blocking=True)
+                    snapshot_ready.record()
+                    have_snapshot = True
+                else:
+                    shown = f"{loss.item():.6f}"
                 print(
                     f"  Epoch [{epoch + 1}/{self.num_epochs}] "
                     f"Batch [{batch_idx + 1}/{len(self.dataloader)}] "
-                    f"Loss: {loss.item():.6f}",
+                    f"Loss: {shown}",
                     end="\r",
                 )
 
-        return epoch_loss / max(batch_count, 1)
+        # 唯一一次 device→host 同步
+        return (loss_buf / max(batch_count, 1)).item()
 
     def train(self) -> None:
         """执行完整的训练流程。"""
@@ -272,30 +571,94 @@ class Trainer:
 
             avg_loss = self._train_one_epoch(epoch)
 
-            self.scheduler.step()
-            elapsed = time.time() - epoch_start
-            current_lr = self.optimizer.param_groups[0]["lr"]
+            # epoch 收尾: 调度器步进、日志与 Checkpoint
+            self._end_of_epoch(epoch, avg_loss, time.time() - epoch_start)
+
+        # 退出前确保最后一次后台保存已落盘
+        self._finish_pending_save()
+        print(f"\n  [Done] {self.monitor_name} 训练完成!")
+
+
+# ======================= 并发训练驱动 ======================
+
 
+def train_concurrent(trainers: list) -> None:
+    """
+    多个 Monitor 共用一张 GPU，各走一条 CUDA stream 轮转训练。
+
+    单个 512 crop 的 UNet 很难打满现代 GPU，串行训练把另一个
+    Monitor 的计算空等掉了；这里主线程按 batch 轮转发射各 Trainer
+    的训练步到各自的 stream，用一个模型的计算填补另一个的内核
+    调度空隙。模型/优化器各 Trainer 独立，LMDB env 经 dataset 的
+    进程级缓存只读共享。代价是激活显存 ×Monitor 数
+    （USE_CHECKPOINT 可抵消大半）。
+    """
+    active = []
+    for t in trainers:
+        if t.dataloader is None:
+            print(f"  [!] 数据不可用，跳过 {t.monitor_name}")
+            continue
+        if t.start_epoch >= t.num_epochs:
             print(
-                f"  Epoch [{epoch + 1}/{self.num_epochs}] "
-                f"Avg Loss: {avg_loss:.6f} | "
-                f"LR: {current_lr:.6f} | "
-                f"Time: {elapsed:.1f}s"
+                f"  [Skip] {t.monitor_name} 已完成全部 "
+                f"{t.num_epochs} 个 Epoch，跳过。"
             )
+            continue
+        active.append(t)
 
-            # --- 保存 Checkpoint ---
-            if (epoch + 1) % self.save_interval == 0:
-                self._save_checkpoint(
-                    self.latest_checkpoint_path, epoch, avg_loss
-                )
+    if not active:
+        return
 
-                # 每 10 个 epoch 额外保存一份带编号的副本
-                if (epoch + 1) % 10 == 0:
-                    epoch_path = self._epoch_checkpoint_path(epoch + 1)
-                    self._save_checkpoint(epoch_path, epoch, avg_loss)
-                    print(f"  Checkpoint 已保存: {epoch_path}")
+    print("\n" + "=" * 60)
+    print(f"并发训练 {len(active)} 个 Monitor: "
+          + ", ".join(t.monitor_name for t in active))
+    print("=" * 60)
 
-        print(f"\n  [Done] {self.monitor_name} 训练完成!")
+    # 每个 Trainer 一条 stream + 独立的 epoch 进度状态。
+    # per-epoch 的累加张量在各自 stream 上创建，保证分配器的
+    # stream 归属一致
+    for t in active:
+        t.stream = torch.cuda.Stream()
+        t.model.train()
+        t._epoch = t.start_epoch
+        with torch.cuda.stream(t.stream):
+            t._loss_buf = torch.zeros((), device=t.device)
+        t._batch_count = 0
+        t._iter = iter(t.dataloader)
+        t._epoch_start = time.time()
+
+    while active:
+        still_active = []
+        for t in active:
+            try:
+                inputs, targets = next(t._iter)
+            except StopIteration:
+                # 本 Trainer 的 epoch 结束: 同步其 stream 后做收尾
+                t.stream.synchronize()
+                avg_loss = (t._loss_buf / max(t._batch_count, 1)).item()
+                t._end_of_epoch(t._epoch, avg_loss, time.time() - t._epoch_start)
+
+                t._epoch += 1
+                if t._epoch >= t.num_epochs:
+                    t._finish_pending_save()
+                    print(f"  [Done] {t.monitor_name} 训练完成!")
+                    continue
+
+                with torch.cuda.stream(t.stream):
+                    t._loss_buf = torch.zeros((), device=t.device)
+                t._batch_count = 0
+                t._iter = iter(t.dataloader)
+                t._epoch_start = time.time()
+                still_active.append(t)
+                continue
+
+            # 训练步发射到本 Trainer 的 stream，host 立即轮转下一个
+            with torch.cuda.stream(t.stream):
+                t._loss_buf += t._train_step(inputs, targets)
+            t._batch_count += 1
+            still_active.append(t)
+
+        active = still_active
 
 
 # ======================= 主入口 ============================
@@ -310,9 +673,17 @@ def main():
     device = Trainer._detect_device()
 
     # 论文要求: 为每个 Monitor 训练一个网络 N_d
-    for monitor_name in MONITORS:
-        trainer = Trainer(monitor_name, device=device)
-        trainer.train()
+    trainers = [Trainer(name, device=device) for name in MONITORS]
+
+    if (
+        TRAIN_CONFIG.get("CONCURRENT_MONITORS")
+        and device.type == "cuda"
+        and len(trainers) > 1
+    ):
+        train_concurrent(trainers)
+    else:
+        for trainer in trainers:
+            trainer.train()
 
     print("\n" + "=" * 60)
     print("全部 Monitor 训练完成!")